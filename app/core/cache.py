@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[Any]]
+# (valor, instante em que foi gravado - time.monotonic())
+_Entry = Tuple[Any, float]
+
+
+class SWRCache:
+    """
+    Cache em memória com stale-while-revalidate e single-flight.
+
+    - Dentro do TTL: devolve o valor guardado sem tocar na origem.
+    - Vencido, mas dentro da janela stale: devolve o valor antigo na hora e
+      dispara uma atualização em background.
+    - Sem valor (ou velho demais): espera a atualização, no máximo `timeout`
+      segundos; se estourar, devolve `default` e a atualização segue rodando
+      para a próxima request.
+
+    Para cada chave existe no máximo uma atualização em andamento, não importa
+    quantas requests cheguem ao mesmo tempo.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: Optional[float] = None, name: str = "cache"):
+        self.ttl = ttl
+        # None = valor vencido pode ser servido indefinidamente enquanto atualiza
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _age(self, entry: _Entry) -> float:
+        return time.monotonic() - entry[1]
+
+    def _is_servable(self, entry: _Entry) -> bool:
+        return self.stale_ttl is None or self._age(entry) < self.ttl + self.stale_ttl
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Valor guardado (fresco ou não), sem disparar atualização."""
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def set(self, key: Hashable, value: Any, age: float = 0.0):
+        """
+        Grava um valor já obtido por fora (ex.: coletor em background ou warm start).
+        'age' permite registrar um valor antigo (ex.: lido do disco) já como vencido.
+        """
+        self._entries[key] = (value, time.monotonic() - age)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    async def _load(self, key: Hashable, loader: Loader):
+        try:
+            value = await loader()
+        except Exception as e:
+            # Mantém o último valor conhecido; quem espera recebe o stale/default
+            logger.warning(f"[{self.name}] Falha ao atualizar '{key}': {e}")
+            raise
+        self.set(key, value)
+        return value
+
+    def _refresh(self, key: Hashable, loader: Loader) -> asyncio.Task:
+        """Garante uma única atualização em andamento por chave."""
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._load(key, loader))
+            self._inflight[key] = task
+            self._tasks.add(task)
+
+            def _done(t: asyncio.Task, key=key):
+                self._tasks.discard(t)
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                if not t.cancelled():
+                    t.exception()  # Evita o aviso "exception was never retrieved"
+
+            task.add_done_callback(_done)
+        return task
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Loader,
+        timeout: Optional[float] = None,
+        default: Any = None,
+    ) -> Any:
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            if self._age(entry) < self.ttl:
+                return entry[0]
+            if self._is_servable(entry):
+                self._refresh(key, loader)
+                return entry[0]
+
+        task = self._refresh(key, loader)
+        fallback = entry[0] if entry is not None else default
+        try:
+            # shield: o timeout desta request não cancela a atualização compartilhada
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            logger.info(f"[{self.name}] '{key}' passou de {timeout}s; servindo fallback")
+            return fallback
+        except Exception:
+            return fallback
+
+    async def close(self):
+        """Cancela atualizações pendentes (usado no shutdown)."""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class IdleLRUCache:
+    """
+    Cache em memória para objetos vivos (ex.: sessões de chat), limitado por
+    quantidade (LRU) e com expiração por inatividade.
+
+    - Ao passar de `max_entries`, sai o item usado há mais tempo.
+    - Itens sem uso por `idle_ttl` segundos são descartados na próxima operação.
+    - pop() tira o item do cache: quem pegou é dono dele até devolver com put(),
+      então duas requests nunca usam o mesmo objeto ao mesmo tempo.
+    """
+
+    def __init__(self, max_entries: int, idle_ttl: float, name: str = "cache"):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.name = name
+        # Ordem de uso: o primeiro é o menos recente
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._entries:
+            key, (_, used_at) = next(iter(self._entries.items()))
+            if now - used_at < self.idle_ttl:
+                break
+            del self._entries[key]
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        self._expire()
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+    def put(self, key: Hashable, value: Any):
+        self._expire()
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -30,15 +30,88 @@ class Settings(BaseSettings):
     # ==========================================
     # Banco de Dados
     # ==========================================
-    DATABASE_URL: str = "sqlite+aiosqlite:///./portfolio.db"
+    DATABASE_URL: str = "sqlite+aiosqlite:///./database.db"
+    # Réplica somente leitura para as páginas públicas (opcional).
+    # Localmente pode ser um segundo arquivo: sqlite+aiosqlite:///./database_read.db
+    DATABASE_READ_URL: Optional[str] = None
+    # Log de todo SQL executado (só para debug; pode ser ligado em runtime pelo admin)
+    DB_ECHO: bool = False
+    # Pool de conexões
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # segundos; evita conexões derrubadas pelo servidor
+    DB_POOL_PRE_PING: bool = True
+    # Apenas SQLite
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
     
     # ==========================================
     # Serviços Externos (GitHub & Gemini)
     # ==========================================
     GITHUB_TOKEN: Optional[str] = None
     GITHUB_USERNAME: str = "Dorminha"
-    
+    # Quantos READMEs podem ser baixados em paralelo durante o sync
+    GITHUB_SYNC_CONCURRENCY: int = 8
+    # Tempo máximo (segundos) por requisição de README antes de desistir
+    GITHUB_README_TIMEOUT: float = 10.0
+    # Sync em background: intervalo (segundos, 0 desativa) e variação aleatória (fração)
+    GITHUB_SYNC_INTERVAL: int = 3600
+    GITHUB_SYNC_JITTER: float = 0.1
+    # Validade do lock entre processos; renovado enquanto o sync roda
+    GITHUB_SYNC_LOCK_TTL: int = 300
+
     GEMINI_API_KEY: Optional[str] = None
+    # Chats vivos em memória por chat_session_id: quantidade máxima e expiração por inatividade (segundos)
+    GEMINI_CHAT_CACHE_SIZE: int = 256
+    GEMINI_CHAT_IDLE_TTL: int = 1800
+    # Contexto do chat enviado à IA (tokens estimados localmente): orçamento total,
+    # limite por mensagem antiga e quanto dele vai para o resumo das mensagens mais velhas
+    CHAT_CONTEXT_TOKEN_BUDGET: int = 1500
+    CHAT_MESSAGE_TOKEN_LIMIT: int = 400
+    CHAT_SUMMARY_TOKEN_BUDGET: int = 300
+    # Quota da API (por minuto) e proteção contra sobrecarga: fila de espera,
+    # retries com backoff exponencial e circuit breaker (falhas seguidas -> pausa em segundos)
+    GEMINI_RPM: int = 15
+    GEMINI_TPM: int = 1_000_000
+    GEMINI_QUEUE_MAX: int = 50
+    GEMINI_QUEUE_TIMEOUT: float = 20.0
+    GEMINI_MAX_ATTEMPTS: int = 3
+    GEMINI_BACKOFF_BASE: float = 1.0
+    GEMINI_BACKOFF_MAX: float = 16.0
+    GEMINI_BREAKER_THRESHOLD: int = 5
+    GEMINI_BREAKER_COOLDOWN: float = 60.0
+    # Cache de respostas para perguntas repetidas (primeira pergunta da conversa):
+    # validade (segundos), similaridade mínima (Jaccard 0-1) e entradas por idioma
+    RESPONSE_CACHE_TTL: int = 24 * 3600
+    RESPONSE_CACHE_THRESHOLD: float = 0.8
+    RESPONSE_CACHE_MAX_ENTRIES: int = 500
+
+    # ==========================================
+    # Renderização de Markdown (pool de processos)
+    # ==========================================
+    MARKDOWN_WORKERS: int = 2
+    MARKDOWN_MAX_PENDING: int = 32
+    # Segundos; ao estourar, a página mostra o texto puro escapado
+    MARKDOWN_TIMEOUT: float = 5.0
+    # Conteúdo que estourou o tempo (ou derrubou o worker) não é renderizado de novo por este tempo
+    MARKDOWN_FAILED_TTL: float = 3600.0
+    # Cache do HTML dos posts: orçamento em RAM (bytes) e pasta opcional em disco
+    BLOG_RENDER_CACHE_BYTES: int = 8 * 1024 * 1024
+    BLOG_RENDER_CACHE_DIR: Optional[str] = None
+
+    # ==========================================
+    # Proxy de Imagens (/img)
+    # ==========================================
+    # Variantes redimensionadas (WebP/AVIF) de avatares, ícones e screenshots externos
+    IMAGE_CACHE_DIR: str = "./image_cache"
+    IMAGE_CACHE_MAX_BYTES: int = 200 * 1024 * 1024
+    # URLs sem hash do conteúdo (ex.: github.com/{user}.png) podem mudar:
+    # a variante em disco é refeita após IMAGE_CACHE_TTL e o navegador revalida após IMAGE_PROXY_MAX_AGE
+    IMAGE_CACHE_TTL: int = 24 * 60 * 60
+    IMAGE_PROXY_MAX_AGE: int = 60 * 60
+    # Tamanho máximo da imagem original baixada
+    IMAGE_PROXY_MAX_SOURCE_BYTES: int = 10 * 1024 * 1024
 
     # ==========================================
     # Game Servers
@@ -49,17 +122,35 @@ class Settings(BaseSettings):
     ZOMBOID_SERVER: str = "localhost:16261"
     ZOMBOID_DISPLAY_NAME: Optional[str] = None
 
+    # Cache de status (segundos): fresco por TTL, depois servido "stale" enquanto atualiza
+    SERVER_STATUS_TTL: float = 30.0
+    SERVER_STATUS_STALE_TTL: float = 600.0
+    # Tempo máximo que uma request espera por cada servidor quando não há valor em cache
+    SERVER_PROBE_TIMEOUT: float = 3.0
+    # Coleta de histórico em background (segundos, 0 desativa)
+    SERVER_STATUS_POLL_INTERVAL: int = 60
+    SERVER_STATUS_POLL_TIMEOUT: float = 10.0
+    # Amostras brutas; os agregados de 5 min / 1 h têm prazos próprios
+    SERVER_STATUS_RAW_RETENTION_HOURS: int = 48
+
     # ==========================================
     # Discord Widget
     # ==========================================
     DISCORD_GUILD_ID: Optional[str] = None
     DISCORD_INVITE_URL: Optional[str] = None
+    # Segundos que uma resposta da API do Discord é reaproveitada (rate limit é por IP)
+    DISCORD_CACHE_TTL: float = 60.0
 
     # ==========================================
     # Steam Integration
     # ==========================================
     STEAM_API_KEY: Optional[str] = None
     STEAM_ID: Optional[str] = None
+    # Tempo total (segundos) para montar o perfil; seções atrasadas usam o último valor em cache
+    STEAM_FETCH_BUDGET: float = 5.0
+    # Conquistas por jogo: só são rebaixadas se o jogo foi jogado desde o último snapshot
+    # ou quando o snapshot passa deste prazo (segundos)
+    STEAM_ACHIEVEMENTS_TTL: int = 24 * 3600
 
     # Configuração Pydantic V2
     model_config = SettingsConfigDict(
@@ -0,0 +1,167 @@
+import importlib.util
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from app.core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 só se o pacote 'h2' estiver instalado (httpx[http2]); senão, HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """
+    Transporte padrão do httpx com contadores simples:
+    total de requests, em andamento e quantas chegaram com o pool cheio (espera).
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.counters = {"requests": 0, "in_flight": 0, "waits": 0}
+
+    def _pool_state(self) -> Dict[str, int]:
+        # Atributos internos do httpcore: só leitura, com fallback se mudarem
+        pool = self._pool
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for c in connections if c.is_idle())
+        queued = sum(1 for r in getattr(pool, "_requests", []) if r.is_queued())
+        return {
+            "connections": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "queued": queued,
+            "max_connections": getattr(pool, "_max_connections", None),
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.counters["requests"] += 1
+        try:
+            state = self._pool_state()
+            if state["max_connections"] and state["active"] >= state["max_connections"]:
+                self.counters["waits"] += 1
+        except Exception:
+            pass
+
+        self.counters["in_flight"] += 1
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.counters["in_flight"] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            state = self._pool_state()
+        except Exception:
+            state = {}
+        return {**state, **self.counters}
+
+
+def default_specs(settings: Settings) -> Dict[str, Dict[str, Any]]:
+    """
+    Configuração de cada cliente nomeado: timeouts por host e limites de keep-alive.
+    Qualquer argumento do httpx.AsyncClient pode ser usado aqui.
+    """
+    user_agent = {"User-Agent": f"{settings.APP_NAME}"}
+
+    github_headers = {
+        "Accept": "application/vnd.github.v3+json",
+        "User-Agent": f"{settings.APP_NAME}-SyncService",
+    }
+    if settings.GITHUB_TOKEN:
+        github_headers["Authorization"] = f"token {settings.GITHUB_TOKEN}"
+
+    return {
+        "github": {
+            "base_url": "https://api.github.com",
+            "headers": github_headers,
+            "timeout": httpx.Timeout(10.0, connect=5.0),
+            "limits": httpx.Limits(max_connections=settings.GITHUB_SYNC_CONCURRENCY + 2, max_keepalive_connections=8),
+        },
+        "steam": {
+            "timeout": httpx.Timeout(10.0, connect=5.0),
+            "limits": httpx.Limits(max_connections=10, max_keepalive_connections=5),
+        },
+        "discord": {
+            "base_url": "https://discord.com/api",
+            "headers": {"User-Agent": f"{settings.APP_NAME} (status widget)"},
+            "timeout": httpx.Timeout(5.0, connect=3.0),
+            "limits": httpx.Limits(max_connections=4, max_keepalive_connections=2),
+        },
+        "images": {
+            "headers": user_agent,
+            "timeout": httpx.Timeout(10.0, connect=5.0),
+            "limits": httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            # Redirects são seguidos manualmente pelo image_proxy (validação de host)
+            "follow_redirects": False,
+        },
+        "gemini": {
+            # Geração pode demorar; conexão não
+            "timeout": httpx.Timeout(60.0, connect=5.0),
+            "limits": httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        },
+    }
+
+
+class HttpClientRegistry:
+    """
+    Registro único dos clientes HTTP da aplicação, um httpx.AsyncClient por nome.
+
+    Cada cliente mantém seu próprio pool (keep-alive, HTTP/2 quando disponível)
+    e é reaproveitado por todas as requests. Criados no lifespan (start) e
+    fechados no shutdown (close); get() também cria sob demanda, para scripts
+    e testes que não passam pelo lifespan.
+    """
+
+    def __init__(self, spec_factory: Callable[[Settings], Dict[str, Dict[str, Any]]] = default_specs):
+        self.spec_factory = spec_factory
+        self._specs: Optional[Dict[str, Dict[str, Any]]] = None
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, InstrumentedTransport] = {}
+
+    @property
+    def specs(self) -> Dict[str, Dict[str, Any]]:
+        if self._specs is None:
+            self._specs = self.spec_factory(get_settings())
+        return self._specs
+
+    def _create(self, name: str) -> httpx.AsyncClient:
+        options = dict(self.specs[name])
+        limits = options.pop("limits", httpx.Limits())
+        transport = InstrumentedTransport(http2=HTTP2_AVAILABLE, limits=limits, retries=1)
+        self._transports[name] = transport
+        return httpx.AsyncClient(transport=transport, **options)
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            if name not in self.specs:
+                raise KeyError(f"Cliente HTTP desconhecido: {name}")
+            client = self._clients[name] = self._create(name)
+        return client
+
+    async def start(self):
+        for name in self.specs:
+            self.get(name)
+        logger.info(f"Clientes HTTP prontos: {', '.join(self._clients)} (HTTP/2={HTTP2_AVAILABLE}).")
+
+    async def close(self):
+        for name, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception:
+                logger.exception(f"Falha ao fechar o cliente HTTP '{name}'.")
+        self._clients.clear()
+        self._transports.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {"http2": HTTP2_AVAILABLE, "closed": client.is_closed, **self._transports[name].stats()}
+            for name, client in self._clients.items()
+        }
+
+
+# Instância Global exportada
+http_clients = HttpClientRegistry()
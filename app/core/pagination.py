@@ -0,0 +1,47 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Gera um cursor opaco (base64 url-safe) com a chave de ordenação do último
+    item da página, ex.: (stars, id) ou (published_at, id).
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _cursor_value(value: Any, expected: type) -> Any:
+    """Valida (e converte) um campo do cursor; levanta ValueError se o tipo não bater."""
+    if expected is datetime:
+        if not isinstance(value, str):
+            raise ValueError("data inválida")
+        return datetime.fromisoformat(value)
+    # bool é subclasse de int no Python: true/false não vira id nem estrelas
+    if isinstance(value, bool) or not isinstance(value, expected):
+        raise ValueError(f"esperado {expected.__name__}")
+    return value
+
+def decode_cursor(cursor: Optional[str], types: Sequence[type]) -> Optional[List[Any]]:
+    """
+    Decodifica um cursor gerado por encode_cursor.
+    `types` é o tipo de cada campo, na ordem (int, str ou datetime, que vem em ISO).
+    Retorna None se o cursor estiver ausente, corrompido, com tamanho ou tipos
+    inesperados (a rota então começa do início em vez de dar erro): um cursor
+    forjado nunca chega à comparação do WHERE.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+    try:
+        return [_cursor_value(value, expected) for value, expected in zip(values, types)]
+    except ValueError:
+        return None
@@ -8,10 +8,17 @@ from contextlib import asynccontextmanager
 
 from app.database import init_db
 from app.core.config import get_settings
+from app.core.http_clients import http_clients
 from app.core.i18n import get_translations
 # CORREÇÃO AQUI: Removido o chat duplicado
 from app.routers import general, projects, blog, admin, chat 
-from app.services.steam_service import close_client as close_steam_client
+from app.services.steam_service import profile_cache as steam_profile_cache, warm_start_cache as warm_steam_cache
+from app.services.sync_scheduler import sync_scheduler
+from app.services.markdown_service import markdown_renderer
+from app.services.game_status import status_cache
+from app.services.status_poller import status_poller
+from app.services.a2s_client import a2s_client
+from app.services.gemini_scheduler import gemini_scheduler
 
 # Rate Limiter
 limiter = Limiter(key_func=get_remote_address)
@@ -19,8 +26,19 @@ limiter = Limiter(key_func=get_remote_address)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    await http_clients.start()
+    await warm_steam_cache()
+    await sync_scheduler.start()
+    await status_poller.start()
     yield
-    await close_steam_client()
+    await status_poller.stop()
+    await sync_scheduler.stop()
+    markdown_renderer.shutdown()
+    await status_cache.close()
+    await steam_profile_cache.close()
+    a2s_client.close()
+    await gemini_scheduler.close()
+    await http_clients.close()
 
 settings = get_settings()
 
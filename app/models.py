@@ -1,5 +1,6 @@
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime, timezone
+from sqlalchemy import JSON, Index
 from sqlmodel import Field, SQLModel
 
 # Função auxiliar para substituir datetime.utcnow (que está depreciado)
@@ -10,7 +11,11 @@ class Project(SQLModel, table=True):
     """
     Modelo de dados para os projetos do portfólio.
     """
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # Keyset pagination: ORDER BY stars DESC, id DESC
+        Index("ix_project_stars_id", "stars", "id"),
+        {"extend_existing": True},
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True)
@@ -21,6 +26,11 @@ class Project(SQLModel, table=True):
     
     # ADICIONADO: Para salvar o README em cache e não depender do GitHub a todo momento
     readme_content: Optional[str] = None 
+
+    # HTML do README já renderizado (Markdown + Pygments) e o hash do conteúdo
+    # que o gerou. Evita renderizar a cada visualização da página.
+    readme_html: Optional[str] = None
+    readme_hash: Optional[str] = None
     
     # Atualizado para timezone aware
     created_at: datetime = Field(default_factory=get_now_utc)
@@ -51,7 +61,11 @@ class ContactMessage(SQLModel, table=True):
     sent_at: datetime = Field(default_factory=get_now_utc)
 
 class Article(SQLModel, table=True):
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # Keyset pagination do blog: WHERE is_published ORDER BY published_at DESC, id DESC
+        Index("ix_article_published_feed", "is_published", "published_at", "id"),
+        {"extend_existing": True},
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
@@ -74,4 +88,99 @@ class ChatMessage(SQLModel, table=True):
     sender: str  # "visitor" or "admin"
     message: str
     timestamp: datetime = Field(default_factory=get_now_utc)
-    is_read: bool = Field(default=False)
\ No newline at end of file
+    is_read: bool = Field(default=False)
+
+class ChatSummary(SQLModel, table=True):
+    """
+    Resumo acumulado (rolling) das mensagens de uma sessão que já saíram
+    da janela de contexto enviada à IA.
+    """
+    __table_args__ = {"extend_existing": True}
+
+    session_id: str = Field(primary_key=True)
+    summary: str = Field(default="")
+    # Maior ChatMessage.id já incorporado ao resumo
+    covered_until_id: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=get_now_utc)
+
+class HttpValidator(SQLModel, table=True):
+    """
+    Validadores HTTP (ETag / Last-Modified) de cada URL já baixada.
+    Usados para requisições condicionais: se nada mudou, o GitHub
+    responde 304 sem corpo e sem gastar rate limit.
+    """
+    __table_args__ = {"extend_existing": True}
+
+    url: str = Field(primary_key=True)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    updated_at: datetime = Field(default_factory=get_now_utc)
+
+class SyncState(SQLModel, table=True):
+    """
+    Estado persistente de cada rotina de sincronização (ex.: 'github').
+    O watermark guarda a mudança mais recente já sincronizada, permitindo
+    que o próximo sync processe apenas o que mudou depois dela.
+    locked_by/locked_until funcionam como lock consultivo entre processos.
+    """
+    __table_args__ = {"extend_existing": True}
+
+    name: str = Field(primary_key=True)
+    watermark: Optional[datetime] = None
+    last_success_at: Optional[datetime] = None
+
+    locked_by: Optional[str] = None
+    locked_until: Optional[datetime] = None
+
+class SyncJob(SQLModel, table=True):
+    """
+    Execução (enfileirada ou concluída) de um sync em background.
+    Fica no banco para que qualquer worker consiga responder o status.
+    """
+    __table_args__ = {"extend_existing": True}
+
+    id: str = Field(primary_key=True)
+    status: str = Field(default="queued", index=True)  # queued | running | done | failed | skipped
+    trigger: str = "manual"  # manual | schedule
+    full: bool = Field(default=False)
+    result: Optional[Dict[str, Any]] = Field(default=None, sa_type=JSON)
+    error: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=get_now_utc)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class ServerStatusSample(SQLModel, table=True):
+    """
+    Leitura bruta de um servidor de jogo/Discord, gravada pelo StatusPoller.
+    Fica pouco tempo no banco: o histórico de longo prazo vive em ServerStatusRollup.
+    """
+    __table_args__ = (
+        Index("ix_server_status_sample_server_time", "server", "sampled_at"),
+        {"extend_existing": True},
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    server: str  # minecraft | zomboid | discord
+    sampled_at: datetime = Field(default_factory=get_now_utc, index=True)
+    online: bool = Field(default=False)
+    players: int = Field(default=0)
+    latency_ms: Optional[float] = None
+
+class ServerStatusRollup(SQLModel, table=True):
+    """
+    Agregado pré-calculado por janela fixa (ex.: 5 min, 1 h).
+    Atualizado a cada amostra, então o histórico é lido sem varrer as amostras brutas.
+    """
+    __table_args__ = {"extend_existing": True}
+
+    server: str = Field(primary_key=True)
+    bucket_seconds: int = Field(primary_key=True)
+    bucket_start: datetime = Field(primary_key=True)
+
+    samples: int = Field(default=0)
+    online_samples: int = Field(default=0)
+    players_sum: int = Field(default=0)
+    players_max: int = Field(default=0)
+    latency_sum: float = Field(default=0.0)
+    latency_count: int = Field(default=0)
@@ -5,9 +5,12 @@ from fastapi.templating import Jinja2Templates
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
 
-from app.database import get_session
+from app.database import get_session, set_sql_echo
 from app.models import ContactMessage
 from app.core.config import get_settings, Settings
+from app.core.http_clients import http_clients
+from app.services.gemini_scheduler import gemini_scheduler
+from app.services.response_cache import response_cache
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -115,4 +118,48 @@ async def admin_dashboard(
     return templates.TemplateResponse(
         "admin/dashboard.html", 
         {"request": request, "messages": messages}
-    )
\ No newline at end of file
+    )
+
+@router.post("/admin/sql-echo")
+async def toggle_sql_echo(request: Request, enabled: bool = Form(...)):
+    """
+    Liga/desliga o log de SQL em tempo de execução (apenas neste worker).
+    """
+    if not require_admin_login(request):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Login necessário")
+
+    set_sql_echo(enabled)
+    return {"sql_echo": enabled}
+
+@router.get("/admin/http-clients")
+async def http_client_stats(request: Request):
+    """
+    Estado dos pools HTTP compartilhados (apenas neste worker):
+    conexões abertas/ociosas, requests na fila e quantas esperaram por conexão.
+    """
+    if not require_admin_login(request):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Login necessário")
+
+    return http_clients.stats()
+
+@router.get("/admin/response-cache")
+async def response_cache_stats(request: Request):
+    """
+    Métricas do cache de respostas da persona (apenas neste worker):
+    acertos exatos/por similaridade, misses, perguntas puladas e taxa de acerto.
+    """
+    if not require_admin_login(request):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Login necessário")
+
+    return response_cache.stats()
+
+@router.get("/admin/gemini-scheduler")
+async def gemini_scheduler_stats(request: Request):
+    """
+    Estado do scheduler do Gemini (apenas neste worker): circuito,
+    fila de espera, quota disponível, retries e rejeições.
+    """
+    if not require_admin_login(request):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Login necessário")
+
+    return gemini_scheduler.stats()
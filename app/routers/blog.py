@@ -1,20 +1,24 @@
-from math import ceil
-from functools import lru_cache
-from typing import Optional, List
+from typing import Optional, List, Tuple
+from datetime import datetime
 
 from fastapi import APIRouter, Request, Depends, Query, status
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select, func
+from sqlmodel import select
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import defer
-import markdown
 
-from app.database import get_session
+from app.database import get_read_session
 from app.models import Article
+from app.core.config import get_settings
+from app.core.pagination import decode_cursor, encode_cursor
+from app.services.markdown_service import content_hash, escape_fallback, markdown_renderer
+from app.services.render_cache import RenderCache
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+settings = get_settings()
 
 # ==========================================
 # SERVICE LAYER (Lógica de Negócio e Cache)
@@ -22,26 +26,71 @@ templates = Jinja2Templates(directory="app/templates")
 
 class BlogService:
     PAGE_SIZE = 10
+    EXTENSIONS = ['fenced_code', 'codehilite', 'tables', 'toc']
     
     # Cache: O Markdown só será reprocessado se o texto mudar.
-    # maxsize=128 guarda os últimos 128 artigos acessados em memória RAM.
+    # Chave (id, digest do conteúdo), limitado por bytes em RAM e,
+    # opcionalmente, persistido em disco para novos workers já subirem "quentes".
+    render_cache = RenderCache(
+        max_bytes=settings.BLOG_RENDER_CACHE_BYTES,
+        disk_dir=settings.BLOG_RENDER_CACHE_DIR
+    )
+
     @staticmethod
-    @lru_cache(maxsize=128)
-    def render_markdown(content: str) -> str:
-        if not content:
+    async def render_article(article: Article) -> str:
+        """
+        Renderiza no pool de processos (não bloqueia o event loop).
+        Se estourar o tempo, devolve o texto escapado e não guarda no cache.
+        """
+        if not article.content:
             return ""
-        return markdown.markdown(
-            content, 
-            extensions=['fenced_code', 'codehilite', 'tables', 'toc']
-        )
+
+        key = (article.id, content_hash(article.content))
+        cached = await BlogService.render_cache.get(key)
+        if cached is not None:
+            return cached
+
+        rendered = await markdown_renderer.try_render(article.content, BlogService.EXTENSIONS)
+        if rendered is None:
+            return escape_fallback(article.content)
+
+        await BlogService.render_cache.set(key, rendered)
+        return rendered
 
     @staticmethod
-    async def get_total_pages(session: AsyncSession) -> int:
-        """Calcula o número total de páginas para a paginação."""
-        statement = select(func.count()).select_from(Article).where(Article.is_published == True)
+    async def get_page(session: AsyncSession, cursor: Optional[str]) -> Tuple[List[Article], Optional[str]]:
+        """
+        Página de artigos publicados via keyset pagination (published_at, id).
+        Busca PAGE_SIZE + 1 itens para saber se existe próxima página,
+        sem COUNT(*). Usa o índice ix_article_published_feed.
+        Retorna (artigos, cursor da próxima página ou None).
+        """
+        statement = (
+            select(Article)
+            .where(Article.is_published == True)
+            .options(defer(Article.content)) # Não traz o texto pesado
+            .order_by(Article.published_at.desc(), Article.id.desc())
+            .limit(BlogService.PAGE_SIZE + 1)
+        )
+
+        position = decode_cursor(cursor, types=(datetime, int))
+        if position:
+            published_at, last_id = position
+            statement = statement.where(or_(
+                Article.published_at < published_at,
+                and_(Article.published_at == published_at, Article.id < last_id),
+            ))
+
         result = await session.exec(statement)
-        total_items = result.one()
-        return ceil(total_items / BlogService.PAGE_SIZE)
+        articles = list(result.all())
+
+        next_cursor = None
+        if len(articles) > BlogService.PAGE_SIZE:
+            articles = articles[:BlogService.PAGE_SIZE]
+            last = articles[-1]
+            next_cursor = encode_cursor(last.published_at, last.id)
+
+        return articles, next_cursor
 
 # ==========================================
 # ROTAS
@@ -50,42 +99,25 @@ class BlogService:
 @router.get("/blog", response_class=HTMLResponse)
 async def blog_list(
     request: Request, 
-    page: int = Query(1, ge=1),
-    session: AsyncSession = Depends(get_session)
+    cursor: Optional[str] = Query(None),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    offset = (page - 1) * BlogService.PAGE_SIZE
-
-    # 1. Busca os artigos (Otimizado com defer)
-    statement = (
-        select(Article)
-        .where(Article.is_published == True)
-        .options(defer(Article.content)) # Não traz o texto pesado
-        .order_by(Article.published_at.desc())
-        .offset(offset)
-        .limit(BlogService.PAGE_SIZE)
-    )
-    result = await session.exec(statement)
-    articles = result.all()
-    
-    # 2. Busca total de páginas (para saber se exibe botão "Próximo")
-    # Nota: Em sites muito grandes, Count(*) pode ser lento. 
-    # Alternativa: Buscar PAGE_SIZE + 1 itens.
-    total_pages = await BlogService.get_total_pages(session)
+    # Busca os artigos (Otimizado com defer + keyset pagination)
+    articles, next_cursor = await BlogService.get_page(session, cursor)
     
     return templates.TemplateResponse("blog_list.html", {
         "request": request, 
         "articles": articles,
-        "page": page,
-        "total_pages": total_pages,
-        "has_next": page < total_pages,
-        "has_prev": page > 1
+        "next_cursor": next_cursor,
+        "has_next": next_cursor is not None,
+        "has_prev": bool(cursor)
     })
 
 @router.get("/blog/{slug}", response_class=HTMLResponse)
 async def blog_post(
     request: Request, 
     slug: str, 
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     # Busca segura
     statement = select(Article).where(Article.slug == slug, Article.is_published == True)
@@ -97,7 +129,7 @@ async def blog_post(
         
     # Processamento com Cache
     # Se 100 pessoas acessarem esse post agora, o markdown só será gerado 1 vez.
-    content_html = BlogService.render_markdown(article.content)
+    content_html = await BlogService.render_article(article)
     
     return templates.TemplateResponse("blog_post.html", {
         "request": request, 
@@ -1,15 +1,16 @@
+import html
 import uuid
-from typing import Annotated, Optional
+from typing import Annotated, AsyncIterator, Optional
 
 from fastapi import APIRouter, Request, Depends, Form, Cookie, Response, status
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.database import get_session
+from app.database import async_session, get_session
 from app.services.chat_service import ChatService
 # Importamos a classe Singleton criada anteriormente
-from app.services.gemini_service import gemini_service 
+from app.services.gemini_service import GeminiStreamInterrupted, gemini_service
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 templates = Jinja2Templates(directory="app/templates")
@@ -119,7 +120,11 @@ async def get_ai_reply(
     context_history = history_objs[:-1]
 
     # 2. Gera resposta (Service de IA - Singleton)
-    ai_text = await gemini_service.get_response(last_user_msg, context_history)
+    ai_text = await gemini_service.get_response(
+        last_user_msg, context_history,
+        session_id=chat_session_id, message_id=history_objs[-1].id,
+        lang=request.state.lang
+    )
 
     # 3. Salva resposta (Service de Chat)
     ai_msg = await chat_service.save_message(chat_session_id, "admin", ai_text)
@@ -127,4 +132,74 @@ async def get_ai_reply(
     return templates.TemplateResponse("chat/ai_message_bubble.html", {
         "request": request,
         "message": ai_msg
-    })
\ No newline at end of file
+    })
+
+# --- Streaming (SSE) ---
+
+def sse_event(event: str, data: str) -> str:
+    """Formata um evento Server-Sent Events (cada linha do payload vira um 'data:')."""
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {event}\n{lines}\n"
+
+@router.get("/stream-ai-response")
+async def stream_ai_reply(
+    request: Request,
+    chat_session_id: SessionIdDep = None
+):
+    """
+    Passo 2 (streaming): a resposta da IA chega pedaço a pedaço via SSE.
+
+    Eventos consumidos pela extensão SSE do HTMX:
+    - token: texto (escapado) anexado à bolha provisória;
+    - done: bolha final renderizada, que substitui a provisória e encerra a conexão.
+
+    A mensagem da IA só é salva quando o stream termina. Se o visitante fechar
+    a janela no meio, nada é gravado e a pergunta segue sem resposta.
+    Se o Gemini falhar no meio, o texto parcial é descartado: a resposta
+    enlatada de erro é salva e a bolha final substitui o que já apareceu.
+    """
+    if not chat_session_id:
+        return Response(status_code=status.HTTP_400_BAD_REQUEST)
+
+    async def event_stream() -> AsyncIterator[str]:
+        # Sessão curta só para o contexto: nenhuma conexão fica presa durante a geração
+        async with async_session() as session:
+            history_objs = await ChatService(session).get_context_for_ai(chat_session_id)
+
+        if not history_objs:
+            yield sse_event("done", "")
+            return
+
+        last = history_objs[-1]
+        if last.sender != "visitor":
+            # Reconexão do EventSource depois da resposta já salva: só reenvia a bolha final
+            bubble = templates.get_template("chat/ai_message_bubble.html").render(request=request, message=last)
+            yield sse_event("done", bubble)
+            return
+
+        # Mesma regra de get_ai_reply: a última mensagem é o prompt, o resto é contexto
+        parts = []
+        stream = gemini_service.stream_response(
+            last.message, history_objs[:-1],
+            session_id=chat_session_id, message_id=last.id, lang=request.state.lang
+        )
+        try:
+            async for chunk in stream:
+                parts.append(chunk)
+                yield sse_event("token", html.escape(chunk))
+            reply = "".join(parts)
+        except GeminiStreamInterrupted as e:
+            reply = e.reply
+
+        async with async_session() as session:
+            ai_msg = await ChatService(session).save_message(chat_session_id, "admin", reply)
+
+        bubble = templates.get_template("chat/ai_message_bubble.html").render(request=request, message=ai_msg)
+        yield sse_event("done", bubble)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Sem buffer em proxies (nginx) para o primeiro token chegar na hora
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,37 +1,43 @@
+import logging
 import time
 import re
+import httpx
 from datetime import datetime
 from typing import Optional
-import asyncio
 
-from fastapi import APIRouter, Request, Depends, Form, status
-from fastapi.responses import HTMLResponse, Response, RedirectResponse
+from fastapi import APIRouter, Request, Depends, Form, HTTPException, status
+from fastapi.responses import FileResponse, HTMLResponse, Response, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select, text, func
 
-from app.database import get_session
+from app.database import get_read_session, get_session
 from app.models import Project, ContactMessage
 from app.core.config import get_settings
-from app.services.game_status import get_minecraft_status, get_zomboid_status, get_discord_status
+from app.services.game_status import get_all_statuses
+from app.services.status_poller import HISTORY_RANGES, get_status_history, get_uptime_summary
 from app.services.steam_service import get_steam_profile
+from app.services.project_listing import list_projects_page
+from app.services.image_proxy import ImageProxyError, image_proxy, is_allowed, negotiate_format, proxied_url
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+# {{ url|proxied(128) }}: imagens externas servidas pelo /img, já redimensionadas
+templates.env.filters["proxied"] = proxied_url
 
 # Validação simples de email via Regex
 EMAIL_REGEX = re.compile(r"[^@]+@[^@]+\.[^@]+")
 
 @router.get("/", response_class=HTMLResponse)
-async def read_root(request: Request, session: AsyncSession = Depends(get_session)):
-    # Otimização: Traz apenas colunas necessárias se o model for pesado
-    statement = select(Project).order_by(Project.stars.desc()).limit(6)
-    result = await session.exec(statement)
-    projects = result.all()
+async def read_root(request: Request, session: AsyncSession = Depends(get_read_session)):
+    # Primeira página da listagem (keyset); o cursor alimenta o "Carregar Mais"
+    projects, next_cursor = await list_projects_page(session)
     
     return templates.TemplateResponse(
         "index.html", 
-        {"request": request, "projects": projects}
+        {"request": request, "projects": projects, "next_cursor": next_cursor}
     )
 
 @router.get("/about", response_class=HTMLResponse)
@@ -112,38 +118,37 @@ async def get_status(session: AsyncSession = Depends(get_session)):
     }
 
 @router.get("/api/servers", response_class=HTMLResponse)
-async def get_servers(request: Request):
-    settings = get_settings()
-    # Parse Zomboid IP/Port
-    zomboid_host = settings.ZOMBOID_SERVER
-    print(f"Querying Servers: MC={settings.MINECRAFT_SERVER}, PZ={zomboid_host}, Discord={settings.DISCORD_GUILD_ID}") # Debug log
-    
-    z_ip, z_port = zomboid_host.split(":") if ":" in zomboid_host else (zomboid_host, 16261)
-    
-    # Fetch statuses in parallel
-    mc_task = get_minecraft_status(settings.MINECRAFT_SERVER)
-    pz_task = get_zomboid_status(z_ip, int(z_port))
-    discord_task = get_discord_status(settings.DISCORD_GUILD_ID)
-    
-    mc_status, pz_status, discord_status = await asyncio.gather(mc_task, pz_task, discord_task)
-    
-    # Apply Custom Display Names
-    if settings.MINECRAFT_DISPLAY_NAME:
-        mc_status["motd"] = settings.MINECRAFT_DISPLAY_NAME
-        
-    if settings.ZOMBOID_DISPLAY_NAME:
-        pz_status["server_name"] = settings.ZOMBOID_DISPLAY_NAME
+async def get_servers(request: Request, session: AsyncSession = Depends(get_read_session)):
+    # Status vem do cache compartilhado (stale-while-revalidate); nada de consultar
+    # os servidores de jogo a cada visitante
+    statuses = await get_all_statuses()
+    # Uptime das últimas 24h a partir dos agregados horários do StatusPoller
+    uptime = await get_uptime_summary(session)
     
     return templates.TemplateResponse(
         "partials/server_grid.html",
         {
             "request": request,
-            "minecraft": mc_status,
-            "zomboid": pz_status,
-            "discord": discord_status
+            "minecraft": statuses["minecraft"],
+            "zomboid": statuses["zomboid"],
+            "discord": statuses["discord"],
+            "uptime": uptime
         }
     )
 
+@router.get("/api/servers/history")
+async def get_servers_history(
+    server: str,
+    range: str = "24h",
+    session: AsyncSession = Depends(get_read_session)
+):
+    if server not in ("minecraft", "zomboid", "discord"):
+        raise HTTPException(status_code=404, detail="Servidor desconhecido")
+    if range not in HISTORY_RANGES:
+        raise HTTPException(status_code=400, detail=f"Período inválido. Use: {', '.join(HISTORY_RANGES)}")
+
+    return await get_status_history(session, server, range)
+
 @router.get("/api/steam", response_class=HTMLResponse)
 async def get_steam(request: Request):
     steam_data = await get_steam_profile()
@@ -152,8 +157,34 @@ async def get_steam(request: Request):
         {"request": request, "steam": steam_data}
     )
 
+@router.get("/img")
+async def proxy_image(request: Request, url: str, w: int = 256):
+    """
+    Proxy de imagens externas (Steam, Discord, GitHub).
+    A primeira request baixa e gera a variante; as seguintes saem direto do disco.
+    URLs com hash do conteúdo ficam em cache imutável no navegador; as demais
+    (ex.: avatar do GitHub) expiram e são revalidadas pelo ETag (304).
+    """
+    if not is_allowed(url):
+        raise HTTPException(status_code=400, detail="Host de imagem não permitido")
+
+    fmt = negotiate_format(request.headers.get("accept", ""))
+    try:
+        path, media_type = await image_proxy.get(url, w, fmt)
+    except (ImageProxyError, httpx.HTTPError, OSError) as e:
+        logger.warning(f"Falha no proxy de imagem ({url}): {e}")
+        # Sem variante local: deixa o navegador buscar a original
+        return RedirectResponse(url=url, status_code=status.HTTP_302_FOUND)
+
+    headers = image_proxy.cache_headers(url, path, fmt)
+    if_none_match = request.headers.get("if-none-match", "")
+    if headers["ETag"] in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers)
+
 @router.get("/sitemap.xml", response_class=Response)
-async def sitemap(request: Request, session: AsyncSession = Depends(get_session)):
+async def sitemap(request: Request, session: AsyncSession = Depends(get_read_session)):
     # 1. Busca a data do projeto mais recente para atualizar o lastmod
     statement = select(func.max(Project.updated_at))
     result = await session.exec(statement)
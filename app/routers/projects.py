@@ -1,17 +1,17 @@
 import os
-from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Request, Depends, HTTPException, Header, Response
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select
-import markdown
+from sqlmodel import select, update
 
-from app.database import get_session
+from app.database import async_session, get_read_session
 from app.models import Project
-from app.services.github_service import GitHubService # Importando a classe otimizada
+from app.services.markdown_service import content_hash, escape_fallback, render_project_readme
+from app.services.project_listing import list_projects_page
+from app.services.sync_scheduler import sync_scheduler
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -35,83 +35,40 @@ async def verify_admin_secret(x_admin_token: str = Header(None)):
 # ==========================================
 
 @router.get("/projects/sync")
-async def sync_projects(session: AsyncSession = Depends(get_session)):
+async def sync_projects(full: bool = False):
     """
-    Sincroniza projetos do GitHub com o Banco de Dados.
-    Usa 'async with' para reutilizar a conexão HTTP (alta performance).
+    Enfileira uma sincronização GitHub -> Banco de Dados e retorna na hora.
+    O sync roda em background (SyncScheduler); acompanhe pelo job_id.
+    Por padrão é incremental; '?full=true' ignora o watermark.
     """
-    
-    # Inicia o serviço usando o Context Manager (abre a conexão 1 vez)
-    async with GitHubService() as gh_service:
-        
-        # 1. Busca lista de projetos no GitHub
-        gh_projects = await gh_service.fetch_projects()
-        
-        if not gh_projects:
-            return {"status": "skipped", "reason": "Nenhum projeto encontrado ou erro na API"}
-
-        # 2. Mapeamento em Memória (Otimização de Banco)
-        # Busca todos os projetos que já temos no banco para evitar fazer SELECT dentro do loop
-        statement = select(Project)
-        db_result = await session.exec(statement)
-        existing_projects_map = {p.url: p for p in db_result.all()}
-        
-        count_new = 0
-        count_updated = 0
-
-        # 3. Processamento
-        for gh_p in gh_projects:
-            # Reutiliza a conexão aberta lá em cima para buscar o README
-            readme_content = await gh_service.fetch_readme(gh_p.name)
-            
-            # Verifica se já existe pelo URL
-            if gh_p.url in existing_projects_map:
-                # ATUALIZA
-                db_project = existing_projects_map[gh_p.url]
-                db_project.stars = gh_p.stars
-                db_project.description = gh_p.description
-                db_project.updated_at = datetime.now(timezone.utc)
-                
-                # Atualiza o README se ele foi encontrado
-                if readme_content:
-                    db_project.readme_content = readme_content
-                
-                session.add(db_project)
-                count_updated += 1
-            else:
-                # CRIA NOVO
-                gh_p.readme_content = readme_content
-                gh_p.created_at = datetime.now(timezone.utc)
-                gh_p.updated_at = datetime.now(timezone.utc)
-                
-                session.add(gh_p)
-                count_new += 1
-        
-        # Salva tudo de uma vez
-        await session.commit()
-
+    job = await sync_scheduler.enqueue(full=full)
     return {
-        "status": "success", 
-        "new": count_new, 
-        "updated": count_updated,
-        "total_synced": len(gh_projects)
+        "status": job.status,
+        "job_id": job.id,
+        "status_url": f"/projects/sync/{job.id}"
     }
 
+@router.get("/projects/sync/{job_id}")
+async def sync_status(job_id: str):
+    """
+    Status de um job de sync: queued, running, done, failed ou skipped.
+    """
+    job = await sync_scheduler.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
 @router.get("/projects/more", response_class=HTMLResponse)
 async def load_more_projects(
     request: Request, 
-    page: int = 1, 
-    session: AsyncSession = Depends(get_session)
+    cursor: Optional[str] = None, 
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Rota para paginação (Infinite Scroll ou botão 'Carregar Mais').
+    Recebe o cursor opaco da página anterior (keyset pagination, sem OFFSET).
     """
-    LIMIT = 6
-    offset = page * LIMIT
-    
-    statement = select(Project).order_by(Project.stars.desc()).offset(offset).limit(LIMIT)
-    result = await session.exec(statement)
-    projects = result.all()
+    projects, next_cursor = await list_projects_page(session, cursor)
     
     # Se não houver mais projetos, retorna 204 (No Content) para o HTMX parar
     if not projects:
@@ -119,14 +76,14 @@ async def load_more_projects(
         
     return templates.TemplateResponse(
         "partials/project_list.html", 
-        {"request": request, "projects": projects, "next_page": page + 1}
+        {"request": request, "projects": projects, "next_cursor": next_cursor}
     )
 
 @router.get("/projects/{name}", response_class=HTMLResponse)
 async def project_detail(
     request: Request, 
     name: str, 
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Exibe os detalhes do projeto.
@@ -140,13 +97,25 @@ async def project_detail(
         # Retorna uma página 404 bonita
         return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
         
-    # Converte Markdown para HTML apenas na visualização
-    content_html = ""
-    if project.readme_content:
-        content_html = markdown.markdown(
-            project.readme_content, 
-            extensions=['fenced_code', 'codehilite', 'tables']
-        )
+    # O HTML é gerado no sync; projetos antigos (sem HTML, ou renderizados com
+    # outro RENDER_VERSION) são renderizados uma única vez aqui.
+    # A sessão desta rota pode ser a réplica: a gravação vai para o primário
+    if project.readme_content and (
+        project.readme_html is None or project.readme_hash != content_hash(project.readme_content)
+    ):
+        if await render_project_readme(project):
+            async with async_session() as write_session:
+                await write_session.execute(
+                    update(Project)
+                    .where(Project.id == project.id)
+                    .values(readme_html=project.readme_html, readme_hash=project.readme_hash)
+                )
+                await write_session.commit()
+
+    content_html = project.readme_html or ""
+    if not content_html and project.readme_content:
+        # Renderização estourou o tempo: mostra o texto puro por enquanto
+        content_html = escape_fallback(project.readme_content)
     
     return templates.TemplateResponse(
         "project_detail.html", 
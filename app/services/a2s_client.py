@@ -0,0 +1,214 @@
+import asyncio
+import io
+import logging
+import socket
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# ByteReader/InfoProtocol are python-a2s internals: requirements.txt pins python-a2s to 1.4.x
+from a2s.byteio import ByteReader
+from a2s.exceptions import BrokenMessageError
+from a2s.info import GoldSrcInfo, InfoProtocol, SourceInfo
+
+logger = logging.getLogger(__name__)
+
+HEADER_SIMPLE = b"\xFF\xFF\xFF\xFF"
+HEADER_MULTI = b"\xFE\xFF\xFF\xFF"
+A2S_CHALLENGE_RESPONSE = 0x41
+# Source split-packet header: message id, total packets, packet number, max packet size
+SPLIT_HEADER = struct.Struct("<IBBH")
+# Most significant bit of the message id: the reassembled payload is bzip2-compressed
+SPLIT_COMPRESSED = 0x80000000
+MAX_CHALLENGES = 3
+
+Address = Tuple[str, int]
+Info = Union[SourceInfo, GoldSrcInfo]
+
+
+class _PendingQuery:
+    """State of one in-flight A2S_INFO request, keyed by the server's resolved address."""
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.sent_at = time.monotonic()
+        self.ping: Optional[float] = None
+        self.challenges = 0
+        self.fragments: List[Tuple[int, bytes]] = []
+        self.waiters = 0
+
+
+class _A2SDatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client: "A2SClient"):
+        self.client = client
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, packet: bytes, addr):
+        self.client._on_datagram(packet, (addr[0], addr[1]))
+
+    def error_received(self, exc: Exception):
+        # ICMP "port unreachable" and friends; the per-query timeout handles it
+        logger.debug(f"A2S socket error: {exc}")
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.client._on_connection_lost(self.transport)
+
+
+class A2SClient:
+    """
+    Asyncio A2S_INFO client that multiplexes every query over one UDP socket.
+
+    Replies are routed back by source address, so any number of servers can be
+    queried concurrently without a thread or a socket per request. Queries are
+    plain coroutines: cancelling or timing out one drops its pending entry and
+    nothing keeps running in the background.
+
+    Concurrent queries for the same server share a single request.
+
+    Split (multi-packet) replies use the Source format. Compressed split
+    replies, sent only by old Source engine builds, are rejected with
+    BrokenMessageError; GoldSrc split replies are not supported either.
+    """
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.encoding = encoding
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[Address, _PendingQuery] = {}
+
+    def _usable(self) -> bool:
+        return (
+            self._transport is not None
+            and not self._transport.is_closing()
+            and self._loop is asyncio.get_running_loop()
+        )
+
+    async def _ensure_transport(self) -> asyncio.DatagramTransport:
+        if not self._usable():
+            # Socket opened lazily, on the loop that is actually running the queries
+            loop = asyncio.get_running_loop()
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _A2SDatagramProtocol(self),
+                local_addr=("0.0.0.0", 0),
+                family=socket.AF_INET,
+            )
+            if self._usable():
+                transport.close()  # Another query opened the socket while we awaited
+            else:
+                self._transport, self._loop = transport, loop
+        return self._transport
+
+    async def _resolve(self, address: Address) -> Address:
+        host, port = address
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, port, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        ip, resolved_port = infos[0][4][:2]
+        return ip, resolved_port
+
+    def _send(self, address: Address, challenge: int = 0):
+        payload = InfoProtocol.serialize_request(challenge)
+        self._transport.sendto(HEADER_SIMPLE + payload, address)
+
+    async def info(self, address: Address, timeout: float = 3.0) -> Info:
+        """A2S_INFO for one server. Raises asyncio.TimeoutError if it does not answer in time."""
+        async with asyncio.timeout(timeout):
+            resolved = await self._resolve(address)
+            await self._ensure_transport()
+
+            query = self._pending.get(resolved)
+            if query is None:
+                query = _PendingQuery(asyncio.get_running_loop().create_future())
+                self._pending[resolved] = query
+                query.future.add_done_callback(lambda _f, key=resolved: self._forget(key, query))
+                self._send(resolved)
+
+            # shield: one caller giving up must not fail the others waiting on the same server
+            query.waiters += 1
+            try:
+                return await asyncio.shield(query.future)
+            finally:
+                query.waiters -= 1
+                if query.waiters == 0 and not query.future.done():
+                    query.future.cancel()  # Nobody is waiting anymore: drop the pending entry
+
+    async def info_many(
+        self, addresses: Sequence[Address], timeout: float = 3.0
+    ) -> List[Union[Info, BaseException]]:
+        """Queries several servers at once; failures are returned in place instead of raised."""
+        return await asyncio.gather(
+            *(self.info(address, timeout) for address in addresses),
+            return_exceptions=True,
+        )
+
+    @staticmethod
+    def _split_fragment(data: bytes) -> Tuple[int, int, bytes]:
+        """Parses a Source split-packet header; returns (packet number, total packets, payload)."""
+        if len(data) < SPLIT_HEADER.size:
+            raise BrokenMessageError("Truncated split packet")
+        message_id, total, number, _max_size = SPLIT_HEADER.unpack_from(data)
+        if message_id & SPLIT_COMPRESSED:
+            raise BrokenMessageError("Compressed split-packet replies are not supported")
+        return number, total, data[SPLIT_HEADER.size:]
+
+    def _forget(self, key: Address, query: _PendingQuery):
+        if self._pending.get(key) is query:
+            del self._pending[key]
+
+    def _on_datagram(self, packet: bytes, addr: Address):
+        query = self._pending.get(addr)
+        if query is None or query.future.done():
+            return  # Late reply for a query that already timed out
+        if query.ping is None:
+            query.ping = time.monotonic() - query.sent_at
+
+        try:
+            header, payload = packet[:4], packet[4:]
+            if header == HEADER_MULTI:
+                number, total, fragment = self._split_fragment(payload)
+                query.fragments.append((number, fragment))
+                if len(query.fragments) < total:
+                    return
+                query.fragments.sort()
+                payload = b"".join(fragment for _, fragment in query.fragments)
+                query.fragments = []
+                if payload.startswith(HEADER_SIMPLE):
+                    payload = payload[4:]
+            elif header != HEADER_SIMPLE:
+                raise BrokenMessageError(f"Invalid packet header: {header!r}")
+
+            reader = ByteReader(io.BytesIO(payload), endian="<", encoding=self.encoding)
+            response_type = reader.read_uint8()
+
+            if response_type == A2S_CHALLENGE_RESPONSE:
+                query.challenges += 1
+                if query.challenges > MAX_CHALLENGES:
+                    raise BrokenMessageError("Server keeps sending challenge responses")
+                self._send(addr, reader.read_uint32())
+                return
+
+            if not InfoProtocol.validate_response_type(response_type):
+                raise BrokenMessageError(f"Invalid response type: {response_type:#x}")
+
+            query.future.set_result(InfoProtocol.deserialize_response(reader, response_type, query.ping))
+        except Exception as e:
+            query.future.set_exception(e)
+
+    def _on_connection_lost(self, transport):
+        if transport is not self._transport:
+            return  # A discarded duplicate socket
+        self._transport = None
+        for query in list(self._pending.values()):
+            if not query.future.done():
+                query.future.set_exception(ConnectionError("A2S socket closed"))
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+
+# Shared client: one socket for every A2S query in the process
+a2s_client = A2SClient()
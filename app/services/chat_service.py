@@ -1,9 +1,35 @@
 # Arquivo: app/services/chat_service.py
 
-from typing import List
+from typing import List, Optional
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from app.models import ChatMessage
+from app.core.config import get_settings
+from app.models import ChatMessage, ChatSummary, get_now_utc
+
+settings = get_settings()
+
+# Tamanho de cada mensagem antiga ao entrar no resumo
+SUMMARY_LINE_TOKENS = 40
+SUMMARY_HEADER = "(Resumo da conversa anterior)"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimativa local de tokens, sem tokenizer: ~4 caracteres por token,
+    nunca menos que um token por palavra.
+    """
+    if not text:
+        return 0
+    return max(len(text) // 4, len(text.split())) + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Corta o texto (no limite de uma palavra) para caber em max_tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * 4].rsplit(" ", 1)[0]
+    return f"{cut} […]"
+
 
 class ChatService:
     def __init__(self, session: AsyncSession):
@@ -25,16 +51,93 @@ class ChatService:
         )
         result = await self.session.exec(statement)
         messages = result.all()
-        
+
         # Inverte a lista para que a mensagem mais antiga fique no topo da janela de chat
         return messages[::-1]
 
-    async def get_context_for_ai(self, session_id: str, limit: int = 6) -> List[ChatMessage]:
+    async def get_context_for_ai(self, session_id: str, token_budget: Optional[int] = None) -> List[ChatMessage]:
         """
-        Busca um histórico curto apenas para dar contexto à Inteligência Artificial.
-        Reutiliza a lógica do get_history.
+        Monta o contexto da Inteligência Artificial dentro de um orçamento de tokens.
+
+        - Mensagens recentes entram inteiras (a última, o prompt, sempre entra);
+          as anteriores são cortadas em CHAT_MESSAGE_TOKEN_LIMIT.
+        - O que não cabe é incorporado ao ChatSummary da sessão (uma linha curta
+          por mensagem, descartando as linhas mais velhas), que abre o contexto.
+        Assim o prompt fica com tamanho quase constante, por mais longa que seja a conversa.
+
+        Retorna do mais Antigo -> Novo. O resumo e as mensagens cortadas são
+        cópias fora da sessão: nada disso é gravado de volta em ChatMessage.
         """
-        return await self.get_history(session_id, limit)
+        budget = token_budget or settings.CHAT_CONTEXT_TOKEN_BUDGET
+
+        summary = await self.session.get(ChatSummary, session_id)
+        covered_until = summary.covered_until_id if summary else 0
+
+        # Lê tudo o que o resumo ainda não cobre (sem janela fixa): o que ficar de fora
+        # do orçamento vai para o resumo e avança a marca, então essa leitura se mantém curta
+        statement = (
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id, ChatMessage.id > covered_until)
+            .order_by(ChatMessage.id.desc())
+        )
+        result = await self.session.exec(statement)
+        recent = result.all()
+        if not recent:
+            return []
+
+        # O resumo tem orçamento reservado; o restante vai para as mensagens recentes
+        available = budget - settings.CHAT_SUMMARY_TOKEN_BUDGET
+        kept: List[ChatMessage] = []
+        used = 0
+        for index, msg in enumerate(recent):
+            if index > 0:
+                msg = self._shortened(msg, settings.CHAT_MESSAGE_TOKEN_LIMIT)
+            cost = estimate_tokens(msg.message)
+            if index > 0 and used + cost > available:
+                break
+            kept.append(msg)
+            used += cost
+
+        dropped = recent[len(kept):]
+        if dropped:
+            summary = await self._fold_into_summary(session_id, summary, dropped[::-1])
+
+        context = kept[::-1]
+        if summary and summary.summary:
+            context.insert(0, ChatMessage(
+                session_id=session_id,
+                sender="visitor",
+                message=f"{SUMMARY_HEADER}\n{summary.summary}",
+            ))
+        return context
+
+    def _shortened(self, msg: ChatMessage, max_tokens: int) -> ChatMessage:
+        text = truncate_to_tokens(msg.message, max_tokens)
+        if text == msg.message:
+            return msg
+        # Cópia transiente: alterar o objeto da sessão gravaria o texto cortado no banco
+        return ChatMessage(id=msg.id, session_id=msg.session_id, sender=msg.sender, message=text, timestamp=msg.timestamp)
+
+    async def _fold_into_summary(self, session_id: str, summary: ChatSummary, messages: List[ChatMessage]) -> ChatSummary:
+        """Acrescenta as mensagens (Antigo -> Novo) ao resumo e o mantém dentro do orçamento."""
+        if summary is None:
+            summary = ChatSummary(session_id=session_id)
+
+        lines = summary.summary.splitlines() if summary.summary else []
+        for msg in messages:
+            who = "Visitante" if msg.sender == "visitor" else "Persona"
+            text = " ".join(msg.message.split())
+            lines.append(f"{who}: {truncate_to_tokens(text, SUMMARY_LINE_TOKENS)}")
+
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > settings.CHAT_SUMMARY_TOKEN_BUDGET:
+            lines.pop(0)
+
+        summary.summary = "\n".join(lines)
+        summary.covered_until_id = messages[-1].id
+        summary.updated_at = get_now_utc()
+        self.session.add(summary)
+        await self.session.commit()
+        return summary
 
     async def save_message(self, session_id: str, sender: str, content: str) -> ChatMessage:
         """
@@ -45,9 +148,9 @@ class ChatService:
             sender=sender,
             message=content
         )
-        
+
         self.session.add(new_msg)
         await self.session.commit()
         await self.session.refresh(new_msg)
-        
-        return new_msg
\ No newline at end of file
+
+        return new_msg
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+async def get_client() -> httpx.AsyncClient:
+    """Returns the shared Discord client (keep-alive) from the HTTP client registry."""
+    return http_clients.get("discord")
+
+
+class DiscordRateLimited(Exception):
+    """Raised when Discord asked us to back off and there is nothing cached to serve."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Discord rate limit, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class DiscordCache:
+    """
+    Response cache for the Discord API that respects its rate-limit headers.
+
+    - Successful responses are reused for DISCORD_CACHE_TTL seconds.
+    - `X-RateLimit-Remaining: 0` (+ `X-RateLimit-Reset-After`) or a 429 with
+      `Retry-After` blocks that path until the reset; meanwhile the last good
+      response is served (even if expired) and no request leaves the server.
+    - A global 429 blocks every path, since Discord bans the IP on repeated hits.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._responses: Dict[str, Tuple[Any, float]] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._global_blocked_until = 0.0
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _retry_in(self, path: str) -> float:
+        until = max(self._blocked_until.get(path, 0.0), self._global_blocked_until)
+        return max(0.0, until - time.monotonic())
+
+    def _fresh(self, path: str) -> Optional[Any]:
+        cached = self._responses.get(path)
+        if cached and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+        return None
+
+    def _serve_stale_or_raise(self, path: str, retry_after: float) -> Any:
+        cached = self._responses.get(path)
+        if cached:
+            return cached[0]
+        raise DiscordRateLimited(retry_after)
+
+    def _record_limits(self, path: str, response: httpx.Response):
+        headers = response.headers
+        now = time.monotonic()
+
+        if response.status_code == 429:
+            retry_after = float(headers.get("Retry-After", 0) or 0)
+            try:
+                body = response.json()
+                retry_after = float(body.get("retry_after", retry_after))
+                is_global = bool(body.get("global")) or headers.get("X-RateLimit-Global") == "true"
+            except ValueError:
+                is_global = headers.get("X-RateLimit-Scope") == "global"
+            retry_after = max(retry_after, 1.0)
+            if is_global:
+                self._global_blocked_until = now + retry_after
+            self._blocked_until[path] = now + retry_after
+            logger.warning(f"Discord rate limited on {path}; backing off {retry_after:.1f}s")
+            return
+
+        if headers.get("X-RateLimit-Remaining") == "0":
+            reset_after = float(headers.get("X-RateLimit-Reset-After", 1) or 1)
+            self._blocked_until[path] = now + reset_after
+
+    async def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET on the Discord API through the cache. Raises httpx errors on failure."""
+        fresh = self._fresh(path)
+        if fresh is not None:
+            return fresh
+
+        retry_after = self._retry_in(path)
+        if retry_after:
+            return self._serve_stale_or_raise(path, retry_after)
+
+        # One request per path at a time; the others reuse its result
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            fresh = self._fresh(path)
+            if fresh is not None:
+                return fresh
+
+            client = await get_client()
+            response = await client.get(path, params=params)
+            self._record_limits(path, response)
+
+            if response.status_code == 429:
+                return self._serve_stale_or_raise(path, self._retry_in(path))
+            response.raise_for_status()
+
+            data = response.json()
+            self._responses[path] = (data, time.monotonic())
+            return data
+
+
+# Global instance shared by every Discord lookup
+discord_cache = DiscordCache(ttl=settings.DISCORD_CACHE_TTL)
@@ -1,10 +1,12 @@
 import asyncio
 import re
-import a2s
 from mcstatus import JavaServer
-from typing import Dict, Any
-import urllib.request
-import json
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+from app.core.cache import SWRCache
+from app.services.a2s_client import a2s_client
+from app.services.discord_service import discord_cache
+from app.core.config import get_settings
 
 async def get_minecraft_status(server_address: str) -> Dict[str, Any]:
     try:
@@ -54,10 +56,9 @@ async def get_minecraft_status(server_address: str) -> Dict[str, Any]:
 
 async def get_zomboid_status(ip: str, port: int) -> Dict[str, Any]:
     try:
-        # Run synchronous a2s call in a separate thread
-        # Increased timeout to 8.0s to avoid false negatives
-        loop = asyncio.get_running_loop()
-        info = await loop.run_in_executor(None, lambda: a2s.info((ip, port), timeout=8.0))
+        # Native asyncio UDP query on the shared A2S socket (no executor thread);
+        # 8s timeout to avoid false negatives, and it is cancellable
+        info = await a2s_client.info((ip, port), timeout=8.0)
         
         return {
             "online": True,
@@ -79,71 +80,108 @@ async def get_zomboid_status(ip: str, port: int) -> Dict[str, Any]:
             "map": "Unknown"
         }
 
-async def get_discord_status(guild_id: str) -> Dict[str, Any]:
+async def get_discord_status(guild_id: Optional[str], invite_url: Optional[str] = None) -> Dict[str, Any]:
     # Try Widget API first (Best for member list)
-    widget_url = f"https://discord.com/api/guilds/{guild_id}/widget.json"
-    
+    if guild_id:
+        try:
+            data = await discord_cache.get_json(f"/guilds/{guild_id}/widget.json")
+            
+            return {
+                "online": True,
+                "game": "Discord",
+                "name": data.get("name", "Discord Server"),
+                "instant_invite": data.get("instant_invite"),
+                "presence_count": data.get("presence_count", 0),
+                "members": data.get("members", [])
+            }
+        except Exception as e:
+            print(f"Discord Widget Error: {e}")
+
+    # Fallback: Invite API (Good for counts, no member list)
+    if not invite_url:
+        return {"online": False, "error": "Widget Disabled & No Invite URL"}
+
     try:
-        loop = asyncio.get_running_loop()
-        
-        def fetch_widget():
-            with urllib.request.urlopen(widget_url, timeout=3) as response:
-                return json.loads(response.read().decode())
+        invite_code = invite_url.rstrip("/").split("/")[-1]
+        data = await discord_cache.get_json(f"/v9/invites/{invite_code}", params={"with_counts": "true"})
         
-        data = await loop.run_in_executor(None, fetch_widget)
+        guild_info = data.get("guild", {})
+        icon_hash = guild_info.get("icon")
+        guild_id_resp = guild_info.get("id")
         
+        icon_url = None
+        if icon_hash and guild_id_resp:
+            icon_url = f"https://cdn.discordapp.com/icons/{guild_id_resp}/{icon_hash}.png"
+
         return {
             "online": True,
             "game": "Discord",
-            "name": data.get("name", "Discord Server"),
-            "instant_invite": data.get("instant_invite"),
-            "presence_count": data.get("presence_count", 0),
-            "members": data.get("members", [])
+            "name": guild_info.get("name", "Discord Server"),
+            "instant_invite": invite_url,
+            "presence_count": data.get("approximate_presence_count", 0),
+            "icon_url": icon_url,
+            "members": [] # Invite API doesn't give member list
         }
-    except Exception:
-        # Fallback: Try Invite API (Good for counts, no member list)
-        # We need the invite code. We'll try to fetch it from settings if passed, 
-        # but here we only have guild_id. 
-        # Ideally we should pass the invite URL to this function too.
-        # For now, let's try to get it from the global settings or just fail gracefully.
-        # Actually, let's import settings here or change the signature.
-        # Changing signature is risky for existing calls.
-        # Let's import get_settings inside the function to avoid circular imports if any.
-        from app.core.config import get_settings
-        settings = get_settings()
-        invite_url = settings.DISCORD_INVITE_URL
-        
-        if not invite_url:
-             return {"online": False, "error": "Widget Disabled & No Invite URL"}
+    except Exception as e:
+        print(f"Discord Error: {e}")
+        return {"online": False, "error": "Connection Failed"}
 
-        try:
-            invite_code = invite_url.split("/")[-1]
-            api_url = f"https://discord.com/api/v9/invites/{invite_code}?with_counts=true"
-            
-            def fetch_invite():
-                req = urllib.request.Request(api_url, headers={'User-Agent': 'Mozilla/5.0'})
-                with urllib.request.urlopen(req, timeout=3) as response:
-                    return json.loads(response.read().decode())
+# Shared by every visitor: one probe per target per TTL instead of one per page load
+settings = get_settings()
+status_cache = SWRCache(
+    ttl=settings.SERVER_STATUS_TTL,
+    stale_ttl=settings.SERVER_STATUS_STALE_TTL,
+    name="server_status",
+)
 
-            data = await loop.run_in_executor(None, fetch_invite)
-            
-            guild_info = data.get("guild", {})
-            icon_hash = guild_info.get("icon")
-            guild_id_resp = guild_info.get("id")
-            
-            icon_url = None
-            if icon_hash and guild_id_resp:
-                icon_url = f"https://cdn.discordapp.com/icons/{guild_id_resp}/{icon_hash}.png"
+def _zomboid_address(server: str):
+    ip, port = server.split(":") if ":" in server else (server, 16261)
+    return ip, int(port)
 
-            return {
-                "online": True,
-                "game": "Discord",
-                "name": guild_info.get("name", "Discord Server"),
-                "instant_invite": invite_url,
-                "presence_count": data.get("approximate_presence_count", 0),
-                "icon_url": icon_url,
-                "members": [] # Invite API doesn't give member list
-            }
-        except Exception as e:
-            print(f"Discord Error: {e}")
-            return {"online": False, "error": "Connection Failed"}
+def _offline(game: str, **extra) -> Dict[str, Any]:
+    """Placeholder shown while a target has never answered within the probe budget."""
+    return {"online": False, "game": game, "players": 0, "max_players": 0, **extra}
+
+def status_probes() -> Dict[str, Callable[[], Awaitable[Dict[str, Any]]]]:
+    """Probe per target, keyed by the name used in the cache and the template."""
+    ip, port = _zomboid_address(settings.ZOMBOID_SERVER)
+    return {
+        "minecraft": lambda: get_minecraft_status(settings.MINECRAFT_SERVER),
+        "zomboid": lambda: get_zomboid_status(ip, port),
+        "discord": lambda: get_discord_status(settings.DISCORD_GUILD_ID, settings.DISCORD_INVITE_URL),
+    }
+
+_FALLBACKS = {
+    "minecraft": lambda: _offline("Minecraft", motd="Checking...", version="Unknown"),
+    "zomboid": lambda: _offline("Project Zomboid", server_name="Checking...", map="Unknown"),
+    "discord": lambda: {"online": False, "error": "Checking..."},
+}
+
+def _apply_display_names(statuses: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    # Copies, so the cached dicts are never mutated
+    if settings.MINECRAFT_DISPLAY_NAME:
+        statuses["minecraft"] = {**statuses["minecraft"], "motd": settings.MINECRAFT_DISPLAY_NAME}
+    if settings.ZOMBOID_DISPLAY_NAME:
+        statuses["zomboid"] = {**statuses["zomboid"], "server_name": settings.ZOMBOID_DISPLAY_NAME}
+    return statuses
+
+async def get_all_statuses() -> Dict[str, Dict[str, Any]]:
+    """
+    Status of every configured server, served from status_cache.
+
+    Each target is awaited on its own budget (SERVER_PROBE_TIMEOUT), so a slow
+    Zomboid query only affects its own card; the probe keeps running and fills
+    the cache for the next request.
+    """
+    probes = status_probes()
+    names = list(probes)
+    results = await asyncio.gather(*(
+        status_cache.get(
+            name,
+            probes[name],
+            timeout=settings.SERVER_PROBE_TIMEOUT,
+            default=_FALLBACKS[name](),
+        )
+        for name in names
+    ))
+    return _apply_display_names(dict(zip(names, results)))
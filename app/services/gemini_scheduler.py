@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import httpx
+from google.genai import errors as genai_errors
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Códigos que indicam sobrecarga/queda do upstream (vale retry e contam para o circuit breaker)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class GeminiBusy(Exception):
+    """Fila cheia ou espera maior que o permitido: a quota está toda em uso."""
+
+
+class GeminiUnavailable(Exception):
+    """Circuit breaker aberto: o upstream está falhando e a chamada nem é feita."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code in RETRYABLE_STATUS
+    if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    # Mesma heurística antiga para erros que chegam só como texto
+    return "429" in str(exc) or "503" in str(exc)
+
+
+class TokenBucket:
+    """Balde que enche continuamente até `per_minute` unidades (requests ou tokens)."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Segundos até haver `amount` disponível (0 = já tem)."""
+        self._refill()
+        amount = min(amount, self.capacity)  # Pedido maior que o balde espera o balde cheio
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+
+class CircuitBreaker:
+    """
+    closed -> open após `threshold` falhas seguidas do upstream;
+    open -> half_open depois de `cooldown` segundos (uma chamada de teste);
+    half_open -> closed no sucesso, ou open de novo na falha.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == "open" and now - self._opened_at >= self.cooldown:
+            self.state = "half_open"
+            self._probe_at = 0.0
+        if self.state == "closed":
+            return True
+        # Uma chamada de teste por vez; se ela sumir (fila, cancelamento), outra após o cooldown
+        if self.state == "half_open" and now - self._probe_at >= self.cooldown:
+            self._probe_at = now
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit breaker do Gemini aberto por {self.cooldown:.0f}s ({self.failures} falhas seguidas).")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+# (future liberado pelo despachante, tokens estimados)
+_Ticket = Tuple[asyncio.Future, int]
+
+
+class GeminiScheduler:
+    """
+    Porta de entrada única para as chamadas ao Gemini.
+
+    - Dois token buckets (requests e tokens por minuto) dimensionados pela quota.
+    - Fila de espera limitada e justa: cada chat_session_id tem sua fila e o
+      despachante alterna entre sessões (round-robin), então um visitante
+      mandando várias mensagens não passa na frente dos outros.
+    - run(): retries com backoff exponencial e jitter para erros de sobrecarga.
+    - Circuit breaker: com o upstream fora, falha na hora (GeminiUnavailable)
+      em vez de empilhar requests esperando timeout.
+    """
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        max_queue: int,
+        queue_timeout: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        breaker_threshold: int,
+        breaker_cooldown: float,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+
+        self._queues: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._waiting = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {"granted": 0, "rejected_busy": 0, "rejected_open": 0, "retries": 0, "failures": 0}
+
+    # ==========================================
+    # FILA JUSTA + TOKEN BUCKET
+    # ==========================================
+
+    def _ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._dispatch())
+
+    def _head(self) -> Optional[Tuple[str, _Ticket]]:
+        """Próximo pedido na ordem round-robin, descartando os já cancelados."""
+        while self._queues:
+            session_id, queue = next(iter(self._queues.items()))
+            while queue and queue[0][0].done():
+                queue.popleft()
+            if queue:
+                return session_id, queue[0]
+            del self._queues[session_id]
+        return None
+
+    async def _dispatch(self):
+        while True:
+            head = self._head()
+            if head is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            session_id, (future, tokens) = head
+            delay = max(self.requests.delay_for(1), self.tokens.delay_for(tokens))
+            if delay > 0:
+                # Sem quota agora: espera encher (ou chegar pedido novo) e reavalia
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            queue = self._queues[session_id]
+            queue.popleft()
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            future.set_result(None)
+            self.metrics["granted"] += 1
+
+            # Sessão vai para o fim da fila de sessões (ou sai, se não tem mais nada)
+            if queue:
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+
+    async def acquire(self, session_id: Optional[str], tokens: int):
+        """
+        Espera a vez desta sessão e quota suficiente.
+        Levanta GeminiUnavailable (circuito aberto) ou GeminiBusy (fila cheia / demora demais).
+        """
+        if not self.breaker.allow():
+            self.metrics["rejected_open"] += 1
+            raise GeminiUnavailable()
+        if self._waiting >= self.max_queue:
+            self.metrics["rejected_busy"] += 1
+            raise GeminiBusy()
+
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session_id or "", deque()).append((future, tokens))
+        self._waiting += 1
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.metrics["rejected_busy"] += 1
+            raise GeminiBusy()
+        finally:
+            self._waiting -= 1
+
+    # ==========================================
+    # RETRIES + CIRCUIT BREAKER
+    # ==========================================
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Backoff exponencial com jitter (0.5x a 1.5x do degrau)."""
+        step = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return step * random.uniform(0.5, 1.5)
+
+    def record_success(self):
+        self.breaker.record_success()
+
+    def record_failure(self, exc: BaseException):
+        # Só falhas do upstream abrem o circuito. Erro de requisição (400...) prova que o
+        # upstream respondeu: conta como sucesso, senão uma sonda meio-aberta ficaria presa
+        if is_retryable(exc):
+            self.metrics["failures"] += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def run(self, session_id: Optional[str], tokens: int, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Executa `call` respeitando quota, fila e circuit breaker,
+        repetindo com backoff enquanto o erro for de sobrecarga.
+        """
+        for attempt in range(self.max_attempts):
+            await self.acquire(session_id, tokens)
+            try:
+                result = await call()
+            except Exception as e:
+                self.record_failure(e)
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+                delay = self.backoff_delay(attempt)
+                self.metrics["retries"] += 1
+                logger.warning(f"⚠️ Gemini sobrecarregado ({e}). Tentativa {attempt + 2} em {delay:.1f}s...")
+                await asyncio.sleep(delay)
+                continue
+            self.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "circuit": self.breaker.state,
+            "waiting": self._waiting,
+            "sessions_waiting": len(self._queues),
+            "requests_available": round(self.requests.level, 2),
+            "tokens_available": round(self.tokens.level),
+        }
+
+    async def close(self):
+        """Para o despachante (shutdown); quem ainda espera recebe GeminiBusy pelo timeout."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+settings = get_settings()
+
+# Instância Global exportada
+gemini_scheduler = GeminiScheduler(
+    rpm=settings.GEMINI_RPM,
+    tpm=settings.GEMINI_TPM,
+    max_queue=settings.GEMINI_QUEUE_MAX,
+    queue_timeout=settings.GEMINI_QUEUE_TIMEOUT,
+    max_attempts=settings.GEMINI_MAX_ATTEMPTS,
+    backoff_base=settings.GEMINI_BACKOFF_BASE,
+    backoff_max=settings.GEMINI_BACKOFF_MAX,
+    breaker_threshold=settings.GEMINI_BREAKER_THRESHOLD,
+    breaker_cooldown=settings.GEMINI_BREAKER_COOLDOWN,
+)
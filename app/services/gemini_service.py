@@ -1,9 +1,13 @@
 from google import genai
 from google.genai import types
 import logging
-import asyncio
-from typing import List
+from typing import AsyncIterator, List, Optional
+from app.core.cache import IdleLRUCache
 from app.core.config import get_settings
+from app.core.http_clients import http_clients
+from app.services.chat_service import estimate_tokens
+from app.services.gemini_scheduler import GeminiBusy, GeminiUnavailable, gemini_scheduler
+from app.services.response_cache import response_cache
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
@@ -11,10 +15,24 @@ logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+
+class GeminiStreamInterrupted(Exception):
+    """
+    O stream falhou (ou terminou sem texto) depois de aberto.
+    `reply` é a resposta enlatada que deve ser salva no lugar do texto parcial.
+    """
+
+    def __init__(self, reply: str):
+        super().__init__(reply)
+        self.reply = reply
+
+
 class GeminiService:
     _instance = None
     _client = None
     _model_name_cache = None
+    _config = None
+    _chats = None
 
     def __new__(cls):
         """Implementação do padrão Singleton."""
@@ -24,10 +42,21 @@ class GeminiService:
         return cls._instance
 
     def _configure(self):
-        """Configura a API key uma única vez."""
+        """Configura a API key, a persona e o cache de chats uma única vez."""
+        self._config = self._build_config()
+        # chat_session_id -> (chat vivo, id do último prompt enviado por ele)
+        self._chats = IdleLRUCache(
+            max_entries=settings.GEMINI_CHAT_CACHE_SIZE,
+            idle_ttl=settings.GEMINI_CHAT_IDLE_TTL,
+            name="gemini_chats",
+        )
         if settings.GEMINI_API_KEY:
             try:
-                self._client = genai.Client(api_key=settings.GEMINI_API_KEY)
+                # Requests async saem pelo cliente 'gemini' do registro (pool/timeout próprios)
+                self._client = genai.Client(
+                    api_key=settings.GEMINI_API_KEY,
+                    http_options=types.HttpOptions(httpx_async_client=http_clients.get("gemini")),
+                )
             except Exception as e:
                 logger.error(f"Erro fatal config Gemini: {e}")
 
@@ -62,93 +91,219 @@ class GeminiService:
         self._model_name_cache = fallback
         return fallback
 
-    async def get_response(self, user_message: str, history_objs: list) -> str:
-        """Método público para gerar respostas."""
+    def _build_config(self) -> types.GenerateContentConfig:
+        """Persona, segurança e parâmetros de geração (montado uma vez, em _configure)."""
+        # System Instruction (Persona)
+        system_instruction = (
+            "Você é a Persona Digital de Luan de Paz, um Engenheiro de Software e RPA. "
+            "Sua stack principal é Python, FastAPI e React. "
+            "Responda sempre em Português do Brasil. "
+            "Seja técnico, porém amigável e conciso."
+        )
+
+        # Configurações de Segurança
+        safety_settings = [
+            types.SafetySetting(
+                category=types.HarmCategory.HARM_CATEGORY_HARASSMENT,
+                threshold=types.HarmBlockThreshold.BLOCK_ONLY_HIGH
+            ),
+            types.SafetySetting(
+                category=types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+                threshold=types.HarmBlockThreshold.BLOCK_ONLY_HIGH
+            ),
+            types.SafetySetting(
+                category=types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
+                threshold=types.HarmBlockThreshold.BLOCK_ONLY_HIGH
+            ),
+            types.SafetySetting(
+                category=types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
+                threshold=types.HarmBlockThreshold.BLOCK_ONLY_HIGH
+            ),
+        ]
+
+        # Configuração de Geração
+        return types.GenerateContentConfig(
+            temperature=0.4,
+            max_output_tokens=500,
+            system_instruction=system_instruction,
+            safety_settings=safety_settings
+        )
+
+    def _build_history(self, history_objs: list) -> List[types.Content]:
+        """Constrói o histórico no formato Gemini."""
+        gemini_history = []
+        for msg in history_objs:
+            # Ignora mensagens vazias
+            if not msg.message or not msg.message.strip():
+                continue
+
+            role = 'user' if msg.sender == 'visitor' else 'model'
+            gemini_history.append(types.Content(role=role, parts=[types.Part.from_text(text=msg.message)]))
+        return gemini_history
+
+    def _create_chat(self, history_objs: list):
+        return self._client.aio.chats.create(
+            model=self._get_best_model_name(),
+            config=self._config,
+            history=self._build_history(history_objs)
+        )
+
+    def _chat_for(self, history_objs: list, session_id: Optional[str]):
+        """
+        Chat vivo da sessão, se ainda bate com o banco; senão um novo,
+        montado a partir do contexto (ChatService.get_context_for_ai).
+
+        O chat em cache só serve se o banco termina em [último prompt que ele
+        enviou, resposta salva]. Resposta não salva (stream interrompido),
+        erro ou histórico grande demais -> remonta.
+        """
+        if session_id:
+            cached = self._chats.pop(session_id)
+            if cached:
+                chat, last_prompt_id = cached
+                if (
+                    len(history_objs) >= 2
+                    and history_objs[-2].id == last_prompt_id
+                    and self._history_tokens(chat) < settings.CHAT_CONTEXT_TOKEN_BUDGET
+                ):
+                    return chat
+        return self._create_chat(history_objs)
+
+    def _cached_answer(self, user_message: str, history_objs: list, lang: str) -> Optional[str]:
+        """Resposta já conhecida para a pergunta; só sem contexto, que mudaria a resposta."""
+        if history_objs:
+            response_cache.skip()
+            return None
+        return response_cache.lookup(user_message, lang)
+
+    def _remember_answer(self, user_message: str, history_objs: list, lang: str, answer: Optional[str]):
+        if not history_objs and answer:
+            response_cache.store(user_message, answer, lang)
+
+    def _history_tokens(self, chat) -> int:
+        """Tokens estimados do histórico do chat vivo (cresce a cada turno)."""
+        return sum(
+            estimate_tokens(part.text or "")
+            for content in chat.get_history()
+            for part in (content.parts or [])
+        )
+
+    def _keep_chat(self, session_id: Optional[str], message_id: Optional[int], chat):
+        """Devolve o chat ao cache depois de uma resposta completa."""
+        if session_id and message_id is not None:
+            self._chats.put(session_id, (chat, message_id))
+
+    def _estimate_request_tokens(self, user_message: str, history_objs: list) -> int:
+        """Tokens que a chamada deve consumir da quota (entrada + máximo de saída)."""
+        prompt = estimate_tokens(user_message) + estimate_tokens(self._config.system_instruction)
+        history = sum(estimate_tokens(msg.message) for msg in history_objs)
+        return prompt + history + (self._config.max_output_tokens or 0)
+
+    def _error_reply(self, e: Exception) -> str:
+        """Resposta enlatada para falhas (fila cheia, circuito aberto, erro do Gemini)."""
+        if isinstance(e, GeminiUnavailable):
+            return "🛠️ A persona está fora do ar no momento. Tente novamente em alguns minutos."
+        if isinstance(e, GeminiBusy) or "429" in str(e):
+            return "Muitas requisições (Quota Excedida). Tente novamente em alguns segundos."
+
+        logger.error(f"ERRO GEMINI: {type(e).__name__} - {e}")
+        return "Desculpe, estou passando por uma manutenção momentânea."
+
+    async def get_response(
+        self,
+        user_message: str,
+        history_objs: list,
+        session_id: Optional[str] = None,
+        message_id: Optional[int] = None,
+        lang: str = "pt",
+    ) -> str:
+        """
+        Método público para gerar respostas.
+        Com session_id/message_id (id do ChatMessage do prompt), o chat fica
+        em memória e a próxima mensagem da sessão envia só o turno novo.
+        Perguntas de abertura repetidas são respondidas pelo response_cache.
+        A chamada passa pelo gemini_scheduler (quota, fila, retries e circuit breaker).
+        """
         if not self._client:
             return "⚠️ Erro: Chave de API não configurada no servidor."
 
-        try:
-            model_name = self._get_best_model_name()
-            
-            # System Instruction (Persona)
-            system_instruction = (
-                "Você é a Persona Digital de Luan de Paz, um Engenheiro de Software e RPA. "
-                "Sua stack principal é Python, FastAPI e React. "
-                "Responda sempre em Português do Brasil. "
-                "Seja técnico, porém amigável e conciso."
-            )
-
-            # Configurações de Segurança
-            safety_settings = [
-                types.SafetySetting(
-                    category=types.HarmCategory.HARM_CATEGORY_HARASSMENT,
-                    threshold=types.HarmBlockThreshold.BLOCK_ONLY_HIGH
-                ),
-                types.SafetySetting(
-                    category=types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                    threshold=types.HarmBlockThreshold.BLOCK_ONLY_HIGH
-                ),
-                types.SafetySetting(
-                    category=types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                    threshold=types.HarmBlockThreshold.BLOCK_ONLY_HIGH
-                ),
-                types.SafetySetting(
-                    category=types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                    threshold=types.HarmBlockThreshold.BLOCK_ONLY_HIGH
-                ),
-            ]
-
-            # Configuração de Geração
-            config = types.GenerateContentConfig(
-                temperature=0.4,
-                max_output_tokens=500,
-                system_instruction=system_instruction,
-                safety_settings=safety_settings
-            )
-
-            # Constrói o histórico no formato Gemini
-            gemini_history = []
-            for msg in history_objs:
-                # Ignora mensagens vazias
-                if not msg.message or not msg.message.strip():
-                    continue
-                
-                role = 'user' if msg.sender == 'visitor' else 'model'
-                gemini_history.append(types.Content(role=role, parts=[types.Part.from_text(text=msg.message)]))
-
-            # Inicia o chat e envia mensagem
-            chat = self._client.aio.chats.create(
-                model=model_name,
-                config=config,
-                history=gemini_history
-            )
-            
+        cached = self._cached_answer(user_message, history_objs, lang)
+        if cached:
+            return cached
+
+        async def attempt() -> str:
+            # Reaproveita o chat da sessão ou inicia um novo (após falha, o cache já não o tem)
+            chat = self._chat_for(history_objs, session_id)
             response = await chat.send_message(user_message)
+            self._keep_chat(session_id, message_id, chat)
             return response.text
 
+        try:
+            tokens = self._estimate_request_tokens(user_message, history_objs)
+            text = await gemini_scheduler.run(session_id, tokens, attempt)
+        except Exception as e:
+            return self._error_reply(e)
+
+        self._remember_answer(user_message, history_objs, lang, text)
+        return text
+
+    async def stream_response(
+        self,
+        user_message: str,
+        history_objs: list,
+        session_id: Optional[str] = None,
+        message_id: Optional[int] = None,
+        lang: str = "pt",
+    ) -> AsyncIterator[str]:
+        """
+        Versão em streaming de get_response: entrega o texto em pedaços
+        conforme o modelo gera (usado pelo SSE do chat).
+        Erros antes do primeiro pedaço passam pelos retries do scheduler e viram
+        a mesma mensagem de fallback; depois dele (ou se nada vier), levanta
+        GeminiStreamInterrupted com a resposta enlatada: o texto parcial já
+        enviado não deve ser salvo como resposta.
+        """
+        if not self._client:
+            yield "⚠️ Erro: Chave de API não configurada no servidor."
+            return
+
+        cached = self._cached_answer(user_message, history_objs, lang)
+        if cached:
+            yield cached
+            return
+
+        async def open_stream():
+            chat = self._chat_for(history_objs, session_id)
+            stream = await chat.send_message_stream(user_message)
+            # O primeiro pedaço faz parte da tentativa: erro antes dele ainda é retentado
+            first = await anext(stream, None)
+            return chat, stream, first
+
+        try:
+            tokens = self._estimate_request_tokens(user_message, history_objs)
+            chat, stream, chunk = await gemini_scheduler.run(session_id, tokens, open_stream)
         except Exception as e:
-            # 1. Retry Logic for 429 (Rate Limit) or 503 (Overloaded)
-            if "429" in str(e) or "503" in str(e):
-                logger.warning(f"⚠️ Rate Limit/Overload detectado: {e}. Tentando novamente em 2s...")
-                try:
-                    await asyncio.sleep(2)
-                    chat = self._client.aio.chats.create(
-                        model=model_name,
-                        config=config,
-                        history=gemini_history
-                    )
-                    response = await chat.send_message(user_message)
-                    return response.text
-                except Exception as retry_e:
-                    logger.error(f"❌ Retry falhou. Erro final: {retry_e}")
-                    # Log full error for debugging paid tier issues
-                    logger.error(f"Full Error Details: {type(retry_e).__name__} - {retry_e}")
-                    
-                    if "429" in str(retry_e):
-                        return "Muitas requisições (Quota Excedida). Tente novamente em alguns segundos."
-
-            logger.error(f"ERRO GEMINI: {str(e)}")
-            return "Desculpe, estou passando por uma manutenção momentânea."
+            yield self._error_reply(e)
+            return
+
+        parts = []
+        try:
+            while chunk is not None:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+                chunk = await anext(stream, None)
+        except Exception as e:
+            # _error_reply registra o erro no log
+            gemini_scheduler.record_failure(e)
+            raise GeminiStreamInterrupted(self._error_reply(e)) from e
+
+        text = "".join(parts)
+        if not text.strip():
+            raise GeminiStreamInterrupted(self._error_reply(ValueError("stream terminou sem texto")))
+
+        self._keep_chat(session_id, message_id, chat)
+        self._remember_answer(user_message, history_objs, lang, text)
 
 # Instância Global exportada
 gemini_service = GeminiService()
\ No newline at end of file
@@ -1,12 +1,21 @@
 import httpx
 import logging
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set, Union
 from app.models import Project
 from app.core.config import get_settings
+from app.core.http_clients import http_clients
 
 # Configura o logger padrão da aplicação
 logger = logging.getLogger(__name__)
 
+class _NotModified:
+    """Sentinela: o GitHub respondeu 304, o conteúdo salvo continua válido."""
+    def __repr__(self) -> str:
+        return "NOT_MODIFIED"
+
+NOT_MODIFIED = _NotModified()
+
 class GitHubService:
     """
     Serviço responsável por interagir com a API do GitHub.
@@ -17,42 +26,39 @@ class GitHubService:
     
     Exemplo:
         async with GitHubService() as service:
-            projects = await service.fetch_projects()
+            async for project in service.fetch_projects():
+                ...
     """
-    BASE_URL = "https://api.github.com"
-    TIMEOUT = 10.0
-
-    def __init__(self):
+    def __init__(self, validators: Optional[Dict[str, Dict[str, Optional[str]]]] = None):
         self.settings = get_settings()
         self.username = self.settings.GITHUB_USERNAME
         self.token = self.settings.GITHUB_TOKEN
         self.client: Optional[httpx.AsyncClient] = None
 
+        # Cache de validadores (URL -> {"etag", "last_modified"}) para requisições condicionais.
+        # Quem chama é responsável por persistir as URLs listadas em 'dirty_validators'.
+        self.validators: Dict[str, Dict[str, Optional[str]]] = validators if validators is not None else {}
+        self.dirty_validators: Set[str] = set()
+        self.stats = {"requests": 0, "not_modified": 0, "errors": 0}
+
+        # Estado da última listagem (preenchido por fetch_projects)
+        self.page_urls: List[str] = []
+        self.newest_change: Optional[datetime] = None
+        self.reached_watermark = False
+
     async def __aenter__(self):
         """
-        Inicia a sessão HTTP (Connection Pool).
+        Usa o cliente 'github' do registro de clientes HTTP (pool compartilhado
+        entre syncs; headers e token já configurados em app/core/http_clients.py).
         """
-        headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "User-Agent": f"{self.settings.APP_NAME}-SyncService"
-        }
-        
-        if self.token:
-            headers["Authorization"] = f"token {self.token}"
-            
-        self.client = httpx.AsyncClient(
-            base_url=self.BASE_URL, 
-            headers=headers, 
-            timeout=self.TIMEOUT
-        )
+        self.client = http_clients.get("github")
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
         """
-        Fecha a sessão HTTP e libera recursos do sistema.
+        O pool pertence ao registro e é fechado no shutdown da aplicação.
         """
-        if self.client:
-            await self.client.aclose()
+        self.client = None
 
     def _ensure_client(self) -> httpx.AsyncClient:
         """
@@ -65,76 +71,161 @@ class GitHubService:
             )
         return self.client
 
-    async def fetch_projects(self) -> List[Project]:
+    async def _conditional_get(
+        self,
+        path: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        conditional: bool = True,
+    ) -> httpx.Response:
         """
-        Busca repositórios públicos, excluindo forks e projetos sem descrição.
+        GET com If-None-Match / If-Modified-Since a partir do cache de validadores.
+        Em respostas 200 guarda os novos validadores; em 304 apenas contabiliza.
         """
         client = self._ensure_client()
-        
+        request = client.build_request("GET", path, params=params, headers=headers)
+        key = str(request.url)
+
+        cached = self.validators.get(key) if conditional else None
+        if cached:
+            if cached.get("etag"):
+                request.headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                request.headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = await client.send(request)
+        self.stats["requests"] += 1
+
+        if response.status_code == 304:
+            self.stats["not_modified"] += 1
+        elif response.status_code == 200:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self.validators[key] = {"etag": etag, "last_modified": last_modified}
+                self.dirty_validators.add(key)
+
+        return response
+
+    @staticmethod
+    def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+        """Converte '2024-01-01T12:00:00Z' (formato do GitHub) em datetime UTC."""
+        if not value:
+            return None
         try:
-            # Query params otimizados
-            params = {
-                "sort": "updated", 
-                "per_page": 100, 
-                "type": "owner"
-            }
-            
-            response = await client.get(f"/users/{self.username}/repos", params=params)
-            response.raise_for_status()
-            repos = response.json()
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
 
-            projects = []
-            for repo in repos:
-                # Regras de Negócio (Filtros)
-                if repo.get("fork") is True:
-                    continue
-                
-                if not repo.get("description"):
-                    continue
-
-                # Opcional: Filtrar por Tópico (Ex: apenas projetos com tag 'portfolio')
-                # topics = repo.get("topics", [])
-                # if "portfolio" not in topics: continue
-
-                # Tratamento de dados nulos (Language pode ser None no GitHub)
-                language = repo.get("language") or "Geral"
-
-                project = Project(
-                    name=repo["name"],
-                    description=repo["description"],
-                    url=repo["html_url"],
-                    stars=repo["stargazers_count"],
-                    language=language 
-                )
-                projects.append(project)
-            
-            # Ordenação por relevância (estrelas)
-            projects.sort(key=lambda x: x.stars, reverse=True)
-            
-            logger.info(f"Sincronização GitHub: {len(projects)} projetos processados com sucesso.")
-            return projects
+    async def fetch_projects(self, since: Optional[datetime] = None) -> AsyncIterator[Project]:
+        """
+        Gera os repositórios públicos, excluindo forks e projetos sem descrição.
+
+        Segue a paginação do header 'Link' sob demanda (uma página por vez) e,
+        como a lista vem ordenada pela atualização mais recente, para assim que
+        encontra um repositório sem mudanças desde 'since' (watermark do último sync).
+        Uma página 304 também encerra a listagem: nada mudou a partir dela.
+
+        Exemplo:
+            async for project in service.fetch_projects(since=watermark):
+                ...
+        """
+        self._ensure_client()
+
+        # Query params otimizados
+        path: Optional[str] = f"/users/{self.username}/repos"
+        params: Optional[dict] = {
+            "sort": "updated",
+            "direction": "desc",
+            "per_page": 100,
+            "type": "owner"
+        }
+        count = 0
+
+        try:
+            while path:
+                response = await self._conditional_get(path, params=params)
+                self.page_urls.append(str(response.request.url))
+
+                if response.status_code == 304:
+                    logger.info("Sincronização GitHub: página de repositórios inalterada (304).")
+                    return
+
+                response.raise_for_status()
+
+                for repo in response.json():
+                    changed_at = max(
+                        filter(None, (
+                            self._parse_timestamp(repo.get("pushed_at")),
+                            self._parse_timestamp(repo.get("updated_at")),
+                        )),
+                        default=None
+                    )
+                    if changed_at and (self.newest_change is None or changed_at > self.newest_change):
+                        self.newest_change = changed_at
+
+                    # Daqui para frente tudo é mais antigo que o último sync
+                    if since and changed_at and changed_at < since:
+                        self.reached_watermark = True
+                        logger.info(f"Sincronização GitHub: {count} projetos alterados desde {since.isoformat()}.")
+                        return
+
+                    # Regras de Negócio (Filtros)
+                    if repo.get("fork") is True:
+                        continue
+
+                    if not repo.get("description"):
+                        continue
+
+                    # Opcional: Filtrar por Tópico (Ex: apenas projetos com tag 'portfolio')
+                    # topics = repo.get("topics", [])
+                    # if "portfolio" not in topics: continue
+
+                    # Tratamento de dados nulos (Language pode ser None no GitHub)
+                    language = repo.get("language") or "Geral"
+
+                    count += 1
+                    yield Project(
+                        name=repo["name"],
+                        description=repo["description"],
+                        url=repo["html_url"],
+                        stars=repo["stargazers_count"],
+                        language=language
+                    )
+
+                # Próxima página (URL absoluta, já inclui os query params)
+                path = response.links.get("next", {}).get("url")
+                params = None
+
+            logger.info(f"Sincronização GitHub: {count} projetos processados com sucesso.")
 
         except httpx.HTTPStatusError as e:
+            self.stats["errors"] += 1
             logger.error(f"Erro HTTP GitHub: {e.response.status_code} - {e.response.text}")
-            return []
-        except Exception as e:
+        except Exception:
+            self.stats["errors"] += 1
             logger.exception("Erro crítico ao buscar projetos do GitHub.")
-            return []
 
-    async def fetch_readme(self, repo_name: str) -> Optional[str]:
+    async def fetch_readme(self, repo_name: str, conditional: bool = True) -> Union[str, None, _NotModified]:
         """
         Busca o conteúdo cru (RAW) do README.md.
+        Retorna NOT_MODIFIED se o README não mudou (use conditional=False
+        quando não houver cópia local para reaproveitar).
         """
-        client = self._ensure_client()
-        
+        self._ensure_client()
+
         # Header específico para receber texto puro em vez de JSON base64
         headers = {"Accept": "application/vnd.github.v3.raw"}
         
         try:
-            response = await client.get(
+            response = await self._conditional_get(
                 f"/repos/{self.username}/{repo_name}/readme",
-                headers=headers
+                headers=headers,
+                conditional=conditional
             )
+
+            if response.status_code == 304:
+                return NOT_MODIFIED
             
             if response.status_code == 404:
                 # Log warning em vez de error, pois é comum não ter README
@@ -145,8 +236,10 @@ class GitHubService:
             return response.text
             
         except httpx.HTTPStatusError as e:
+            self.stats["errors"] += 1
             logger.error(f"Erro ao baixar README de '{repo_name}': {e.response.status_code}")
             return None
         except Exception as e:
+            self.stats["errors"] += 1
             logger.error(f"Erro inesperado no README de '{repo_name}': {str(e)}")
             return None
\ No newline at end of file
@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import httpx
+from PIL import Image, ImageOps, features
+
+from app.core.config import get_settings
+from app.core.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+# Só estes hosts podem ser buscados (evita virar um proxy aberto / SSRF)
+ALLOWED_HOSTS = {
+    "avatars.steamstatic.com",
+    "avatars.akamai.steamstatic.com",
+    "media.steampowered.com",
+    "cdn.akamai.steamstatic.com",
+    "steamcdn-a.akamaihd.net",
+    "steamuserimages-a.akamaihd.net",
+    "images.steamusercontent.com",
+    "cdn.discordapp.com",
+    "github.com",
+    "avatars.githubusercontent.com",
+}
+
+# Larguras aceitas: o pedido é arredondado para cima, limitando o número de variantes
+WIDTHS = (32, 64, 128, 256, 512, 1024)
+
+# formato -> (content-type, opções do Pillow)
+FORMATS = {
+    "avif": ("image/avif", {"quality": 60}),
+    "webp": ("image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("image/jpeg", {"quality": 85, "optimize": True}),
+}
+
+# Segmento do caminho que é um hash do conteúdo (avatares/ícones da Steam e do Discord):
+# se a imagem muda, a URL muda junto, então a variante pode ser imutável
+CONTENT_HASH_SEGMENT = re.compile(r"/(?:a_)?[0-9a-f]{20,}(?:_[a-z]+)?(?:\.\w+)?(?=/|$)")
+IMMUTABLE_MAX_AGE = 31536000
+
+MAX_PIXELS = 40_000_000  # Proteção contra "decompression bombs"
+MAX_REDIRECTS = 3
+
+
+class ImageProxyError(Exception):
+    """URL recusada pelo proxy (host fora da lista, esquema inválido...)."""
+
+
+def is_allowed(url: Optional[str]) -> bool:
+    if not url:
+        return False
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and parts.hostname in ALLOWED_HOSTS
+
+
+def is_content_addressed(url: str) -> bool:
+    return bool(CONTENT_HASH_SEGMENT.search(urlsplit(url).path.lower()))
+
+
+def snap_width(width: int) -> int:
+    for allowed in WIDTHS:
+        if width <= allowed:
+            return allowed
+    return WIDTHS[-1]
+
+
+def negotiate_format(accept: str) -> str:
+    """Melhor formato aceito pelo navegador (AVIF > WebP > JPEG)."""
+    if "image/avif" in accept and features.check("avif"):
+        return "avif"
+    if "image/webp" in accept:
+        return "webp"
+    return "jpeg"
+
+
+def proxied_url(url: Optional[str], width: int = 256) -> Optional[str]:
+    """Filtro Jinja: troca a URL externa pela rota /img (se o host for permitido)."""
+    if not is_allowed(url):
+        return url
+    return f"/img?url={quote(url, safe='')}&w={snap_width(width)}"
+
+
+def _transcode(data: bytes, width: int, fmt: str) -> bytes:
+    """Redimensiona e re-codifica (CPU, roda em thread)."""
+    try:
+        source = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        # Pillow recusa antes do nosso limite de MAX_PIXELS (acima de 2x MAX_IMAGE_PIXELS)
+        raise ImageProxyError("Imagem grande demais") from e
+    with source:
+        if source.width * source.height > MAX_PIXELS:
+            raise ImageProxyError("Imagem grande demais")
+        source.seek(0)  # GIF animado: usa o primeiro quadro
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+
+        has_alpha = image.mode in ("RGBA", "LA", "P") and fmt != "jpeg"
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        _, options = FORMATS[fmt]
+        out = io.BytesIO()
+        image.save(out, format=fmt.upper(), **options)
+        return out.getvalue()
+
+
+class ImageProxy:
+    """
+    Busca imagens remotas uma única vez e guarda variantes redimensionadas em disco.
+
+    - Chave = (URL, largura, formato); cada variante é um arquivo no cache_dir.
+    - LRU em disco: o atime marca o último acesso; ao passar de max_bytes,
+      os arquivos menos usados são apagados.
+    - O mtime marca quando a variante foi gerada: URLs sem hash do conteúdo
+      são baixadas de novo depois de `ttl` segundos.
+    - Várias requests pela mesma variante esperam um único download.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_source_bytes: int, ttl: int, max_age: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_source_bytes = max_source_bytes
+        self.ttl = ttl
+        self.max_age = max_age
+        self._size: Optional[int] = None
+        # _store/_evict rodam em threads (asyncio.to_thread) e mexem no mesmo _size
+        self._size_lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _path(self, url: str, width: int, fmt: str) -> Path:
+        digest = hashlib.sha256(f"{url}|{width}".encode()).hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}.{fmt}"
+
+    def _variants(self):
+        # Arquivos .tmp são gravações em andamento de outra thread: nem contam nem saem no LRU
+        return (f for f in self.cache_dir.rglob("*.*") if f.is_file() and f.suffix != ".tmp")
+
+    def _disk_usage(self) -> int:
+        if self._size is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._size = sum(f.stat().st_size for f in self._variants())
+        return self._size
+
+    def _evict(self):
+        """Apaga os arquivos menos acessados até ficar em 90% do limite (com _size_lock)."""
+        if self._disk_usage() <= self.max_bytes:
+            return
+        files = sorted((f.stat().st_atime, f.stat().st_size, f) for f in self._variants())
+        target = self.max_bytes * 0.9
+        for _, size, path in files:
+            if self._size <= target:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+
+    async def _download(self, url: str) -> bytes:
+        for _ in range(MAX_REDIRECTS + 1):
+            # Cliente 'images' não segue redirects: cada salto é validado abaixo
+            async with http_clients.get("images").stream("GET", url) as resp:
+                if resp.is_redirect:
+                    # Ex.: github.com/{user}.png -> avatars.githubusercontent.com
+                    url = str(resp.url.join(resp.headers["location"]))
+                    if not is_allowed(url):
+                        raise ImageProxyError(f"Redirecionado para host não permitido: {urlsplit(url).hostname}")
+                    continue
+
+                resp.raise_for_status()
+                if not resp.headers.get("content-type", "").startswith("image/"):
+                    raise ImageProxyError("Resposta não é uma imagem")
+
+                chunks, received = [], 0
+                async for chunk in resp.aiter_bytes():
+                    received += len(chunk)
+                    if received > self.max_source_bytes:
+                        raise ImageProxyError("Imagem de origem acima do limite")
+                    chunks.append(chunk)
+                return b"".join(chunks)
+
+        raise ImageProxyError("Redirecionamentos demais")
+
+    def _store(self, path: Path, encoded: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(encoded)
+
+        with self._size_lock:
+            usage = self._disk_usage()  # Antes de trocar, para não contar o arquivo novo duas vezes
+            if path.exists():
+                usage -= path.stat().st_size  # Variante vencida sendo substituída
+            os.replace(tmp_path, path)  # Troca atômica: ninguém lê arquivo pela metade
+            self._size = usage + len(encoded)
+            self._evict()
+
+    async def _build(self, url: str, width: int, fmt: str, path: Path):
+        data = await self._download(url)
+        encoded = await asyncio.to_thread(_transcode, data, width, fmt)
+        # Escrita e varredura do LRU tocam o disco: fora do event loop
+        await asyncio.to_thread(self._store, path, encoded)
+
+    def _finished(self, key: str, future: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception():
+            logger.warning(f"Falha ao gerar imagem {key}: {future.exception()}")
+
+    def _is_fresh(self, url: str, path: Path) -> bool:
+        if is_content_addressed(url):
+            return True
+        return time.time() - path.stat().st_mtime <= self.ttl
+
+    @staticmethod
+    def _touch(path: Path):
+        # Só o atime (último acesso, usado pelo LRU); o mtime guarda quando a variante foi gerada
+        stat = path.stat()
+        os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+
+    async def get(self, url: str, width: int, fmt: str) -> Tuple[Path, str]:
+        """Caminho da variante em disco (criando ou renovando se preciso) e o content-type."""
+        if not is_allowed(url):
+            raise ImageProxyError("Host não permitido")
+        width = snap_width(width)
+        path = self._path(url, width, fmt)
+
+        stale = path.exists()
+        if stale and self._is_fresh(url, path):
+            self._touch(path)
+            return path, FORMATS[fmt][0]
+
+        key = str(path)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._build(url, width, fmt, path))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finished(key, f))
+        try:
+            await asyncio.shield(future)
+        except (ImageProxyError, httpx.HTTPError, OSError):
+            # Origem fora do ar: a variante vencida ainda é melhor que nada
+            if stale and path.exists():
+                return path, FORMATS[fmt][0]
+            raise
+        return path, FORMATS[fmt][0]
+
+    def cache_headers(self, url: str, path: Path, fmt: str) -> Dict[str, str]:
+        """
+        Cache-Control + ETag da variante. Só URLs com hash do conteúdo são imutáveis;
+        as demais (ex.: github.com/{user}.png) revalidam após max_age.
+        """
+        stat = path.stat()
+        if is_content_addressed(url):
+            cache_control = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            cache_control = f"public, max-age={self.max_age}"
+        return {
+            "Cache-Control": cache_control,
+            "ETag": f'"{fmt}-{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            "Vary": "Accept",
+        }
+
+
+settings = get_settings()
+
+# Instância Global exportada
+image_proxy = ImageProxy(
+    cache_dir=settings.IMAGE_CACHE_DIR,
+    max_bytes=settings.IMAGE_CACHE_MAX_BYTES,
+    max_source_bytes=settings.IMAGE_PROXY_MAX_SOURCE_BYTES,
+    ttl=settings.IMAGE_CACHE_TTL,
+    max_age=settings.IMAGE_PROXY_MAX_AGE,
+)
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.database import async_session
+from app.models import SyncState
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLock:
+    """
+    Lock consultivo entre processos baseado em uma linha de SyncState.
+
+    Quem consegue o UPDATE condicional (lock livre, expirado ou já seu)
+    vira dono até 'locked_until'. Enquanto o bloco roda, um heartbeat
+    renova o prazo; se o processo morrer, o lock expira sozinho.
+
+    Exemplo:
+        async with LeaseLock("github", ttl=300).hold() as acquired:
+            if acquired:
+                ...
+    """
+
+    def __init__(self, name: str, ttl: float, session_factory=async_session):
+        self.name = name
+        self.ttl = ttl
+        self.session_factory = session_factory
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def _ensure_row(self, session):
+        if await session.get(SyncState, self.name) is not None:
+            return
+        session.add(SyncState(name=self.name))
+        try:
+            await session.commit()
+        except IntegrityError:
+            # Outro processo criou a linha ao mesmo tempo
+            await session.rollback()
+
+    async def acquire(self) -> bool:
+        """Tenta pegar (ou renovar) o lock. Não bloqueia."""
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as session:
+            await self._ensure_row(session)
+            statement = (
+                update(SyncState)
+                .where(SyncState.name == self.name)
+                .where(or_(
+                    SyncState.locked_until.is_(None),
+                    SyncState.locked_until < now,
+                    SyncState.locked_by == self.owner,
+                ))
+                .values(locked_by=self.owner, locked_until=now + timedelta(seconds=self.ttl))
+            )
+            result = await session.execute(statement)
+            await session.commit()
+            return result.rowcount == 1
+
+    async def is_held(self) -> bool:
+        """True se alguém (este ou outro processo) tem o lock dentro do prazo."""
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as session:
+            statement = select(SyncState.name).where(SyncState.name == self.name, SyncState.locked_until >= now)
+            result = await session.execute(statement)
+            return result.first() is not None
+
+    async def release(self):
+        async with self.session_factory() as session:
+            statement = (
+                update(SyncState)
+                .where(SyncState.name == self.name, SyncState.locked_by == self.owner)
+                .values(locked_by=None, locked_until=None)
+            )
+            await session.execute(statement)
+            await session.commit()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                if not await self.acquire():
+                    logger.warning(f"Lock '{self.name}' perdido para outro processo.")
+                    return
+            except Exception:
+                logger.exception(f"Falha ao renovar o lock '{self.name}'.")
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncIterator[bool]:
+        """Entrega True se o lock foi obtido; libera ao sair do bloco."""
+        if not await self.acquire():
+            yield False
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            yield True
+        finally:
+            heartbeat.cancel()
+            try:
+                await self.release()
+            except Exception:
+                logger.exception(f"Falha ao liberar o lock '{self.name}'.")
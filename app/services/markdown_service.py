@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import html
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+import markdown
+
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    from app.models import Project
+
+logger = logging.getLogger(__name__)
+
+# Extensões usadas nos READMEs dos projetos
+README_EXTENSIONS: List[str] = ['fenced_code', 'codehilite', 'tables']
+
+# Quantos conteúdos problemáticos são lembrados (os mais antigos saem primeiro)
+FAILED_RENDER_MAX = 256
+
+# Incrementar quando as extensões/configuração mudarem: invalida o HTML salvo
+RENDER_VERSION = "1"
+
+
+def content_hash(content: str) -> str:
+    """Hash do conteúdo + versão do renderizador (identifica o HTML gerado)."""
+    digest = hashlib.sha256()
+    digest.update(RENDER_VERSION.encode())
+    digest.update(b"\0")
+    digest.update(content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def render_markdown_sync(content: str, extensions: Sequence[str]) -> str:
+    """Renderização pura (executada dentro dos processos do pool)."""
+    if not content:
+        return ""
+    return markdown.markdown(content, extensions=list(extensions))
+
+
+def escape_fallback(content: str) -> str:
+    """HTML de emergência: texto puro escapado, sem Markdown nem highlight."""
+    return f"<pre>{html.escape(content)}</pre>"
+
+
+class MarkdownRenderer:
+    """
+    Executa o Python-Markdown (+ Pygments) em um ProcessPoolExecutor,
+    fora do event loop, para um README grande não travar as outras rotas.
+
+    - MARKDOWN_WORKERS: número de processos do pool (uma vaga por processo)
+    - MARKDOWN_MAX_PENDING: renderizações simultâneas (em execução + esperando vaga);
+      acima disso, cai direto para o texto escapado
+    - MARKDOWN_TIMEOUT: tempo máximo da renderização em si (a espera por vaga não conta)
+    - MARKDOWN_FAILED_TTL: por quanto tempo um conteúdo que estourou o tempo
+      vai direto para o texto escapado, sem nova tentativa
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.workers = max(1, settings.MARKDOWN_WORKERS)
+        self.timeout = settings.MARKDOWN_TIMEOUT
+        self.max_pending = max(1, settings.MARKDOWN_MAX_PENDING)
+        self.failed_ttl = settings.MARKDOWN_FAILED_TTL
+        # chave do conteúdo -> instante da falha
+        self._failed: "OrderedDict[str, float]" = OrderedDict()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Incrementa a cada _recycle: quem perdeu o pool para o timeout de outro tenta de novo
+        self._generation = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 'spawn' evita herdar threads/conexões do processo do servidor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _recycle(self):
+        """
+        Descarta o pool (quebrado ou com worker preso); o próximo uso cria outro.
+        shutdown() não interrompe um worker ocupado, então os processos são
+        encerrados antes: sem isso cada timeout deixaria um processo a 100% de CPU.
+        """
+        if self._executor is not None:
+            processes = list((getattr(self._executor, "_processes", None) or {}).values())
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._generation += 1
+
+    @staticmethod
+    def _failure_key(content: str, extensions: Sequence[str]) -> str:
+        return f"{content_hash(content)}:{','.join(extensions)}"
+
+    def _recently_failed(self, key: str) -> bool:
+        failed_at = self._failed.get(key)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at > self.failed_ttl:
+            del self._failed[key]
+            return False
+        return True
+
+    def _remember_failure(self, key: str):
+        self._failed[key] = time.monotonic()
+        self._failed.move_to_end(key)
+        while len(self._failed) > FAILED_RENDER_MAX:
+            self._failed.popitem(last=False)
+
+    async def try_render(self, content: str, extensions: Sequence[str]) -> Optional[str]:
+        """
+        Renderiza no pool. Retorna None se estourar o timeout, a fila estiver
+        cheia ou o pool falhar. Só o conteúdo que estourou o tempo é lembrado:
+        ele devolve None na hora até passar MARKDOWN_FAILED_TTL.
+        """
+        if not content:
+            return ""
+
+        failure_key = self._failure_key(content, extensions)
+        if self._recently_failed(failure_key):
+            return None
+
+        if self._pending >= self.max_pending:
+            logger.warning("Fila de renderização de Markdown cheia; servindo texto puro.")
+            return None
+
+        if self._slots is None:
+            # Uma vaga por worker: o que entra no pool começa a rodar na hora
+            self._slots = asyncio.Semaphore(self.workers)
+
+        self._pending += 1
+        try:
+            async with self._slots:
+                return await self._render_in_pool(content, tuple(extensions), failure_key)
+        finally:
+            self._pending -= 1
+
+    async def _render_in_pool(self, content: str, extensions: Tuple[str, ...], failure_key: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        # Segunda tentativa só quando o pool foi descartado por causa de outra renderização
+        for _ in range(2):
+            generation = self._generation
+            future = loop.run_in_executor(self._get_executor(), render_markdown_sync, content, extensions)
+            try:
+                return await asyncio.wait_for(future, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Renderização de Markdown excedeu {self.timeout}s ({len(content)} caracteres).")
+                if generation == self._generation:
+                    self._recycle()
+                self._remember_failure(failure_key)
+                return None
+            except asyncio.CancelledError:
+                # shutdown(cancel_futures=True) de outro _recycle; cancelamento da request propaga
+                if asyncio.current_task().cancelling() or generation == self._generation:
+                    raise
+            except BrokenProcessPool:
+                if generation == self._generation:
+                    logger.error("Pool de renderização quebrado; recriando.")
+                    self._recycle()
+        return None
+
+    async def render(self, content: str, extensions: Sequence[str]) -> str:
+        """Como try_render, mas cai para texto escapado em caso de timeout."""
+        rendered = await self.try_render(content, extensions)
+        return rendered if rendered is not None else escape_fallback(content)
+
+    def shutdown(self):
+        """Encerra o pool. Chamado no shutdown da aplicação."""
+        self._recycle()
+
+
+# Instância Global exportada
+markdown_renderer = MarkdownRenderer()
+
+
+async def render_project_readme(project: "Project") -> bool:
+    """
+    Gera e guarda no próprio projeto o HTML do README (com Pygments).
+    Só renderiza se o conteúdo mudou desde a última vez.
+    Retorna True se os campos foram alterados (e precisam ser salvos).
+    Em caso de timeout nada é salvo, para tentar de novo depois.
+    """
+    if not project.readme_content:
+        changed = project.readme_html is not None
+        project.readme_html = None
+        project.readme_hash = None
+        return changed
+
+    new_hash = content_hash(project.readme_content)
+    if project.readme_html is not None and project.readme_hash == new_hash:
+        return False
+
+    rendered = await markdown_renderer.try_render(project.readme_content, README_EXTENSIONS)
+    if rendered is None:
+        return False
+
+    project.readme_html = rendered
+    project.readme_hash = new_hash
+    return True
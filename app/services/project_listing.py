@@ -0,0 +1,52 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import defer
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models import Project
+
+PAGE_SIZE = 6
+
+
+async def list_projects_page(
+    session: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+) -> Tuple[List[Project], Optional[str]]:
+    """
+    Página de projetos ordenada por estrelas (desc), usando keyset pagination.
+
+    Em vez de OFFSET, filtra pelo último (stars, id) visto: o custo não cresce
+    com a profundidade da página e não há itens pulados/duplicados quando as
+    estrelas mudam no meio do scroll. Usa o índice ix_project_stars_id.
+
+    Retorna (projetos, cursor da próxima página ou None).
+    """
+    statement = (
+        select(Project)
+        .options(defer(Project.readme_content), defer(Project.readme_html)) # Não traz o README
+        .order_by(Project.stars.desc(), Project.id.desc())
+        .limit(limit + 1) # Um a mais só para saber se existe próxima página
+    )
+
+    position = decode_cursor(cursor, types=(int, int))
+    if position:
+        stars, last_id = position
+        statement = statement.where(or_(
+            Project.stars < stars,
+            and_(Project.stars == stars, Project.id < last_id),
+        ))
+
+    result = await session.exec(statement)
+    projects = list(result.all())
+
+    next_cursor = None
+    if len(projects) > limit:
+        projects = projects[:limit]
+        last = projects[-1]
+        next_cursor = encode_cursor(last.stars, last.id)
+
+    return projects, next_cursor
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple, Union
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.models import HttpValidator, Project, SyncState
+from app.services.github_service import NOT_MODIFIED, GitHubService
+from app.services.markdown_service import render_project_readme
+
+logger = logging.getLogger(__name__)
+
+
+class ProjectSyncService:
+    """
+    Pipeline de sincronização GitHub -> Banco de Dados.
+
+    Fases (cada uma é cronometrada e devolvida em 'timings_ms'):
+      1. list   - percorre as páginas de repositórios sob demanda
+      2. fetch  - baixa os READMEs em paralelo, limitado por um semáforo,
+                  já a partir do primeiro repositório listado
+      3. upsert - aplica cada README no banco assim que ele chega
+
+    O sync é incremental: a listagem para no primeiro repositório sem
+    mudanças desde o watermark salvo em SyncState, então o custo é
+    proporcional ao que mudou e não ao total de repositórios.
+    Use full=True para ignorar o watermark.
+
+    Todas as requisições ao GitHub são condicionais (ETag / Last-Modified).
+    Recursos que voltam 304 não são reprocessados nem regravados, e os
+    validadores são salvos na mesma transação dos projetos.
+
+    Exemplo:
+        result = await ProjectSyncService(session).run()
+    """
+    STATE_NAME = "github"
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        concurrency: Optional[int] = None,
+        readme_timeout: Optional[float] = None,
+        full: bool = False,
+    ):
+        settings = get_settings()
+        self.session = session
+        self.full = full
+        self.concurrency = max(1, concurrency or settings.GITHUB_SYNC_CONCURRENCY)
+        self.readme_timeout = readme_timeout or settings.GITHUB_README_TIMEOUT
+        self.timings: Dict[str, float] = {"list": 0.0, "fetch": 0.0, "upsert": 0.0}
+
+    def _timings_ms(self) -> Dict[str, float]:
+        return {phase: round(seconds * 1000, 2) for phase, seconds in self.timings.items()}
+
+    async def _load_state(self) -> Tuple[Dict[str, Project], Dict[str, HttpValidator], SyncState]:
+        """
+        Carrega os projetos já salvos (indexados pela URL), os validadores HTTP
+        e o estado do último sync.
+        Encerra a transação de leitura logo em seguida para devolver a conexão
+        ao pool enquanto o GitHub é consultado (expire_on_commit=False
+        mantém os objetos utilizáveis).
+        """
+        result = await self.session.exec(select(Project))
+        existing = {p.url: p for p in result.all()}
+
+        result = await self.session.exec(select(HttpValidator))
+        validators = {v.url: v for v in result.all()}
+
+        state = await self.session.get(SyncState, self.STATE_NAME) or SyncState(name=self.STATE_NAME)
+
+        await self.session.commit()
+        return existing, validators, state
+
+    @staticmethod
+    def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+        """SQLite devolve datetimes sem fuso; assumimos UTC."""
+        if value and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+    def _save_validators(self, gh_service: GitHubService, stored: Dict[str, HttpValidator]):
+        """Persiste apenas os validadores que mudaram neste sync."""
+        now = datetime.now(timezone.utc)
+        for url in gh_service.dirty_validators:
+            values = gh_service.validators[url]
+            row = stored.get(url) or HttpValidator(url=url)
+            row.etag = values.get("etag")
+            row.last_modified = values.get("last_modified")
+            row.updated_at = now
+            self.session.add(row)
+
+    async def _fetch_readme(
+        self,
+        gh_service: GitHubService,
+        semaphore: asyncio.Semaphore,
+        project: Project,
+        conditional: bool,
+    ) -> Tuple[Project, Union[str, None, object], bool]:
+        """
+        Baixa um README respeitando o limite de concorrência e o timeout.
+        Retorna (projeto, conteúdo ou NOT_MODIFIED, falhou).
+        """
+        async with semaphore:
+            try:
+                readme = await asyncio.wait_for(
+                    gh_service.fetch_readme(project.name, conditional=conditional),
+                    timeout=self.readme_timeout,
+                )
+                return project, readme, False
+            except asyncio.TimeoutError:
+                logger.warning(f"Timeout ({self.readme_timeout}s) ao baixar README de '{project.name}'")
+                return project, None, True
+
+    async def _upsert(self, gh_p: Project, readme_content: Union[str, None, object], existing: Dict[str, Project]) -> str:
+        """
+        Aplica um projeto vindo do GitHub na sessão.
+        Retorna "new", "updated" ou "unchanged" (nada é gravado neste caso).
+        """
+        now = datetime.now(timezone.utc)
+
+        if readme_content is NOT_MODIFIED:
+            readme_content = None
+
+        if gh_p.url in existing:
+            db_project = existing[gh_p.url]
+            changed = (
+                db_project.stars != gh_p.stars
+                or db_project.description != gh_p.description
+                or db_project.language != gh_p.language
+                or (readme_content and readme_content != db_project.readme_content)
+            )
+            if not changed:
+                return "unchanged"
+
+            db_project.stars = gh_p.stars
+            db_project.description = gh_p.description
+            db_project.language = gh_p.language
+            db_project.updated_at = now
+
+            # Atualiza o README apenas se ele foi encontrado
+            if readme_content:
+                db_project.readme_content = readme_content
+                await render_project_readme(db_project)
+
+            self.session.add(db_project)
+            return "updated"
+
+        gh_p.readme_content = readme_content
+        await render_project_readme(gh_p)
+        gh_p.created_at = now
+        gh_p.updated_at = now
+        self.session.add(gh_p)
+        existing[gh_p.url] = gh_p
+        return "new"
+
+    async def run(self) -> Dict[str, Any]:
+        existing, stored_validators, state = await self._load_state()
+
+        # Sem projetos no banco não há o que reaproveitar: força download completo
+        incremental = bool(existing) and not self.full
+        validators = {
+            url: {"etag": v.etag, "last_modified": v.last_modified}
+            for url, v in stored_validators.items()
+        } if incremental else {}
+        since = self._as_utc(state.watermark) if incremental else None
+
+        counts = {"new": 0, "updated": 0, "unchanged": 0}
+        count_failed = 0
+        count_listed = 0
+
+        async with GitHubService(validators=validators) as gh_service:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            tasks = []
+
+            try:
+                # 1. LIST: cada repositório listado já dispara o download do README
+                started = time.perf_counter()
+                async for gh_p in gh_service.fetch_projects(since=since):
+                    self.timings["list"] += time.perf_counter() - started
+
+                    # Só vale pedir 304 se temos uma cópia local do README
+                    cached = existing.get(gh_p.url)
+                    conditional = incremental and bool(cached and cached.readme_content)
+                    tasks.append(asyncio.create_task(
+                        self._fetch_readme(gh_service, semaphore, gh_p, conditional)
+                    ))
+                    started = time.perf_counter()
+                self.timings["list"] += time.perf_counter() - started
+                count_listed = len(tasks)
+
+                # 2. FETCH (concorrente) + 3. UPSERT (à medida que os resultados chegam)
+                fetch_started = time.perf_counter()
+                for next_done in asyncio.as_completed(tasks):
+                    gh_p, readme_content, failed = await next_done
+                    count_failed += int(failed)
+
+                    started = time.perf_counter()
+                    counts[await self._upsert(gh_p, readme_content, existing)] += 1
+                    self.timings["upsert"] += time.perf_counter() - started
+                self.timings["fetch"] = time.perf_counter() - fetch_started
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+            listing_ok = gh_service.stats["errors"] == 0 and count_failed == 0
+
+            if not count_listed and not listing_ok:
+                return {
+                    "status": "skipped",
+                    "reason": "Nenhum projeto encontrado ou erro na API",
+                    "timings_ms": self._timings_ms(),
+                }
+
+            if listing_ok:
+                # Avança o watermark apenas se tudo foi baixado; senão o próximo
+                # sync precisa rever estes repositórios
+                newest = gh_service.newest_change
+                current = self._as_utc(state.watermark)
+                if newest and (current is None or newest > current):
+                    state.watermark = newest
+                state.last_success_at = datetime.now(timezone.utc)
+                self.session.add(state)
+            else:
+                # Não guarda os validadores das páginas, para a listagem não voltar 304
+                gh_service.dirty_validators.difference_update(gh_service.page_urls)
+
+            # Salva tudo de uma vez (projetos + validadores + watermark na mesma transação)
+            started = time.perf_counter()
+            self._save_validators(gh_service, stored_validators)
+            await self.session.commit()
+            self.timings["upsert"] += time.perf_counter() - started
+
+        logger.info(
+            f"Sync concluído ({'incremental' if since else 'completo'}): "
+            f"{counts['new']} novos, {counts['updated']} atualizados, "
+            f"{gh_service.stats['not_modified']} recursos inalterados (304), "
+            f"{count_failed} READMEs com falha. Tempos: {self._timings_ms()}"
+        )
+
+        return {
+            "status": "success" if count_listed else "unchanged",
+            "mode": "incremental" if since else "full",
+            "new": counts["new"],
+            "updated": counts["updated"],
+            "unchanged": gh_service.stats["not_modified"],
+            "failed": count_failed,
+            "pages": len(gh_service.page_urls),
+            "total_synced": count_listed,
+            "timings_ms": self._timings_ms(),
+        }
@@ -0,0 +1,117 @@
+import logging
+import os
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+# (id do artigo, digest do conteúdo)
+CacheKey = Tuple[int, str]
+
+
+class RenderCache:
+    """
+    Cache de HTML renderizado em dois níveis.
+
+    1. Memória: LRU limitado por orçamento em bytes (não por número de itens),
+       então poucos artigos gigantes não expulsam todo o resto sem controle.
+    2. Disco (opcional): um arquivo por artigo, compartilhado entre workers
+       e reaproveitado após reinícios.
+
+    A chave inclui o digest do conteúdo, então editar o artigo invalida o cache.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries: "OrderedDict[CacheKey, str]" = OrderedDict()
+        self._size = 0
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _entry_size(html: str) -> int:
+        return sys.getsizeof(html)
+
+    def _disk_path(self, key: CacheKey) -> Path:
+        article_id, digest = key
+        return self.disk_dir / f"{article_id}-{digest}.html"
+
+    def _remember(self, key: CacheKey, html: str):
+        """Insere na memória, expulsando os menos usados até caber no orçamento."""
+        size = self._entry_size(html)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._size -= self._entry_size(self._entries.pop(key))
+
+        while self._entries and self._size + size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= self._entry_size(evicted)
+            self.counters["evictions"] += 1
+
+        self._entries[key] = html
+        self._size += size
+
+    async def get(self, key: CacheKey) -> Optional[str]:
+        html = self._entries.get(key)
+        if html is not None:
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return html
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                async with aiofiles.open(path, mode="r", encoding="utf-8") as f:
+                    html = await f.read()
+                self._remember(key, html)
+                self.counters["disk_hits"] += 1
+                return html
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Falha ao ler cache de render em disco ({path}): {e}")
+
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, key: CacheKey, html: str):
+        self._remember(key, html)
+
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            async with aiofiles.open(tmp_path, mode="w", encoding="utf-8") as f:
+                await f.write(html)
+            # Troca atômica: outro worker nunca lê um arquivo pela metade
+            os.replace(tmp_path, path)
+
+            # Remove versões antigas do mesmo artigo
+            article_id, _ = key
+            for old in self.disk_dir.glob(f"{article_id}-*.html"):
+                if old != path:
+                    old.unlink(missing_ok=True)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache de render em disco ({path}): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["disk_hits"] + self.counters["misses"]
+        hits = self.counters["hits"] + self.counters["disk_hits"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,258 @@
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# MinHash: NUM_PERM funções de hash, agrupadas em BANDS faixas para o índice LSH.
+# Com 16 faixas de 4 linhas, pares com Jaccard ~0.6+ quase sempre viram candidatos.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+# Palavras que não mudam o sentido da pergunta (já normalizadas: sem acento)
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de do da dos das em no na nos nas por pelo pela para pra pro
+com e ou que se me te voce vc tu eu meu minha seu sua seus suas teu tua qual quais
+como onde quando quanto quantos e eh sao ser estao tem ter tenho faz faco fazer
+isso isto esse essa este esta ai mais muito
+the an of to in on for with and or is are do does you your i my me what which how
+where when who can could would will be have has it this that about
+""".split())
+# Negações: se aparecem em uma pergunta e não na outra, o sentido é oposto
+NEGATIONS = frozenset("""
+nao nunca sem nem jamais nenhum nenhuma ninguem
+not no never without dont doesnt didnt cannot
+""".split())
+
+_MERSENNE = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+
+
+def _permutations(count: int) -> List[Tuple[int, int]]:
+    # Coeficientes determinísticos (mesmos em todo worker/restart)
+    perms = []
+    for i in range(count):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little") % _MERSENNE or 1
+        b = int.from_bytes(digest[8:], "little") % _MERSENNE
+        perms.append((a, b))
+    return perms
+
+
+_PERMS = _permutations(NUM_PERM)
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos, sem pontuação e com espaços colapsados."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def shingles(normalized: str) -> FrozenSet[str]:
+    """N-gramas de caracteres (com bordas de palavra): robusto a typos e plurais."""
+    padded = f" {normalized} "
+    if len(padded) <= SHINGLE_SIZE:
+        return frozenset([padded])
+    return frozenset(padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1))
+
+
+def minhash(items: FrozenSet[str]) -> Tuple[int, ...]:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in items]
+    return tuple(
+        min(((a * h + b) % _MERSENNE) & _MASK for h in hashes)
+        for a, b in _PERMS
+    )
+
+
+def _words(normalized: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """(palavras de conteúdo, negações) da pergunta normalizada."""
+    words = normalized.split()
+    # "don t" / "doesn t" depois da normalização viram negação inteira
+    joined = [w + "t" if i + 1 < len(words) and words[i + 1] == "t" else w for i, w in enumerate(words)]
+    negations = frozenset(w for w in joined if w in NEGATIONS)
+    content = frozenset(w for w in joined if w not in NEGATIONS and w not in STOPWORDS and w != "t")
+    return content, negations
+
+
+def _same_stem(a: str, b: str) -> bool:
+    """Mesma palavra com flexão diferente (projeto/projetos, contratar/contrato)."""
+    if a == b:
+        return True
+    prefix = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        prefix += 1
+    return prefix >= max(4, min(len(a), len(b)) - 2)
+
+
+def words_compatible(a: str, b: str) -> bool:
+    """
+    Veto por palavras: trigramas não enxergam que "backend" e "frontend"
+    ou "tem" e "não tem" mudam a resposta. Negações precisam ser as mesmas
+    e toda palavra de conteúdo precisa de uma equivalente na outra pergunta.
+    """
+    content_a, negations_a = _words(a)
+    content_b, negations_b = _words(b)
+    if negations_a != negations_b:
+        return False
+    return all(any(_same_stem(w, o) for o in content_b) for w in content_a) and all(
+        any(_same_stem(w, o) for o in content_a) for w in content_b
+    )
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _Entry:
+    __slots__ = ("normalized", "shingles", "signature", "answer", "stored_at")
+
+    def __init__(self, normalized: str, shingle_set: FrozenSet[str], signature: Tuple[int, ...], answer: str):
+        self.normalized = normalized
+        self.shingles = shingle_set
+        self.signature = signature
+        self.answer = answer
+        self.stored_at = time.monotonic()
+
+
+class _LanguageIndex:
+    """Entradas de um idioma: mapa exato + índice LSH por faixa da assinatura."""
+
+    def __init__(self):
+        self.exact: Dict[str, _Entry] = {}
+        self.bands: List[Dict[Tuple[int, ...], Set[str]]] = [{} for _ in range(BANDS)]
+
+    @staticmethod
+    def _band_keys(signature: Tuple[int, ...]):
+        for band in range(BANDS):
+            yield band, signature[band * ROWS:(band + 1) * ROWS]
+
+    def add(self, entry: _Entry):
+        self.remove(entry.normalized)
+        self.exact[entry.normalized] = entry
+        for band, key in self._band_keys(entry.signature):
+            self.bands[band].setdefault(key, set()).add(entry.normalized)
+
+    def remove(self, normalized: str):
+        entry = self.exact.pop(normalized, None)
+        if entry is None:
+            return
+        for band, key in self._band_keys(entry.signature):
+            bucket = self.bands[band].get(key)
+            if bucket is not None:
+                bucket.discard(normalized)
+                if not bucket:
+                    del self.bands[band][key]
+
+    def candidates(self, signature: Tuple[int, ...]) -> Set[str]:
+        found: Set[str] = set()
+        for band, key in self._band_keys(signature):
+            found |= self.bands[band].get(key, set())
+        return found
+
+
+class ResponseCache:
+    """
+    Cache de respostas da persona para perguntas repetidas.
+
+    - Chave por idioma; a pergunta é normalizada (caixa, acentos, pontuação).
+    - Primeiro busca o texto normalizado exato; depois perguntas parecidas
+      via MinHash + LSH, confirmadas por Jaccard real dos shingles >= threshold
+      e pelo veto de palavras (words_compatible: conteúdo e negações).
+    - Entradas vencem após `ttl` segundos; acima de `max_entries` por idioma,
+      sai a mais antiga.
+    - Só vale para a primeira pergunta da conversa: com histórico, a resposta
+      depende do contexto e o cache é ignorado (quem chama decide).
+    """
+
+    def __init__(self, ttl: float, threshold: float, max_entries: int):
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._languages: Dict[str, _LanguageIndex] = {}
+        self.metrics = {"lookups": 0, "exact_hits": 0, "near_hits": 0, "misses": 0, "stores": 0, "skipped": 0}
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.stored_at > self.ttl
+
+    def lookup(self, prompt: str, lang: str = "pt") -> Optional[str]:
+        self.metrics["lookups"] += 1
+        index = self._languages.get(lang)
+        normalized = normalize(prompt)
+        if index is None or not normalized:
+            self.metrics["misses"] += 1
+            return None
+
+        entry = index.exact.get(normalized)
+        if entry is not None:
+            if not self._expired(entry):
+                self.metrics["exact_hits"] += 1
+                return entry.answer
+            index.remove(normalized)
+
+        shingle_set = shingles(normalized)
+        best, best_score = None, 0.0
+        for candidate_key in index.candidates(minhash(shingle_set)):
+            candidate = index.exact[candidate_key]
+            if self._expired(candidate):
+                index.remove(candidate_key)
+                continue
+            score = jaccard(shingle_set, candidate.shingles)
+            if score >= self.threshold and score > best_score and words_compatible(normalized, candidate.normalized):
+                best, best_score = candidate, score
+
+        if best is not None:
+            self.metrics["near_hits"] += 1
+            logger.info(f"Resposta em cache (similaridade {best_score:.2f}): '{prompt[:40]}' ~ '{best.normalized[:40]}'")
+            return best.answer
+
+        self.metrics["misses"] += 1
+        return None
+
+    def store(self, prompt: str, answer: str, lang: str = "pt"):
+        normalized = normalize(prompt)
+        if not normalized or not answer:
+            return
+        index = self._languages.setdefault(lang, _LanguageIndex())
+        shingle_set = shingles(normalized)
+        index.add(_Entry(normalized, shingle_set, minhash(shingle_set), answer))
+        self.metrics["stores"] += 1
+
+        # dict preserva a ordem de inserção: o primeiro é o mais antigo
+        while len(index.exact) > self.max_entries:
+            index.remove(next(iter(index.exact)))
+
+    def skip(self):
+        """Conta uma pergunta que não passou pelo cache (conversa com contexto)."""
+        self.metrics["skipped"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["lookups"]
+        hits = self.metrics["exact_hits"] + self.metrics["near_hits"]
+        return {
+            **self.metrics,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "entries": {lang: len(index.exact) for lang, index in self._languages.items()},
+        }
+
+
+settings = get_settings()
+
+# Instância Global exportada
+response_cache = ResponseCache(
+    ttl=settings.RESPONSE_CACHE_TTL,
+    threshold=settings.RESPONSE_CACHE_THRESHOLD,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_settings
+from app.database import async_session
+from app.models import ServerStatusRollup, ServerStatusSample
+from app.services.game_status import status_cache, status_probes
+from app.services.lease_lock import LeaseLock
+
+logger = logging.getLogger(__name__)
+
+# Janelas pré-agregadas (segundos) e por quanto tempo cada uma é mantida
+ROLLUP_RETENTION = {
+    300: timedelta(days=8),     # 5 min -> gráfico de 24h
+    3600: timedelta(days=90),   # 1 h   -> gráficos de 7d / 30d
+}
+
+# Períodos aceitos pelo endpoint de histórico: (duração, janela usada)
+HISTORY_RANGES = {
+    "24h": (timedelta(hours=24), 300),
+    "7d": (timedelta(days=7), 3600),
+    "30d": (timedelta(days=30), 3600),
+}
+
+
+def bucket_start(moment: datetime, bucket_seconds: int) -> datetime:
+    """Início da janela fixa que contém 'moment' (alinhado ao epoch, em UTC)."""
+    epoch = int(moment.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % bucket_seconds, tz=timezone.utc)
+
+
+def sample_from_status(server: str, status: Dict[str, Any], sampled_at: datetime) -> ServerStatusSample:
+    """Converte o dict dos probes em uma linha compacta."""
+    players = status.get("players", status.get("presence_count", 0)) or 0
+    return ServerStatusSample(
+        server=server,
+        sampled_at=sampled_at,
+        online=bool(status.get("online")),
+        players=int(players),
+        latency_ms=status.get("latency"),
+    )
+
+
+class StatusPoller:
+    """
+    Coleta o status dos servidores em intervalo fixo e guarda o histórico.
+
+    - Só um worker coleta por vez: o LeaseLock 'server_status' fica com quem
+      o pegou primeiro e é renovado a cada ciclo.
+    - Cada ciclo grava as amostras brutas e atualiza os agregados
+      (ServerStatusRollup), e aquece o status_cache usado por /api/servers.
+    - A retenção apaga amostras brutas antigas e agregados fora do prazo.
+
+    Iniciado/parado pelo lifespan em app/main.py.
+    """
+
+    LOCK_NAME = "server_status"
+
+    def __init__(self, session_factory=async_session):
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.interval = settings.SERVER_STATUS_POLL_INTERVAL
+        self.probe_timeout = settings.SERVER_STATUS_POLL_TIMEOUT
+        self.raw_retention = timedelta(hours=settings.SERVER_STATUS_RAW_RETENTION_HOURS)
+        # O lease sobrevive a dois ciclos perdidos antes de outro worker assumir
+        self.lock = LeaseLock(self.LOCK_NAME, max(self.interval * 3, 60), session_factory)
+
+        self._task: Optional[asyncio.Task] = None
+        self._last_prune = 0.0
+
+    # ==========================================
+    # CICLO DE VIDA
+    # ==========================================
+
+    async def start(self):
+        if self._task or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"Status poller iniciado (intervalo={self.interval}s).")
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            await self.lock.release()
+        except Exception:
+            logger.exception("Falha ao liberar o lock do status poller.")
+
+    async def _loop(self):
+        while True:
+            started = time.monotonic()
+            try:
+                if await self.lock.acquire():
+                    await self.poll_once()
+            except Exception:
+                logger.exception("Falha no ciclo do status poller.")
+            await asyncio.sleep(max(1.0, self.interval - (time.monotonic() - started)))
+
+    # ==========================================
+    # COLETA
+    # ==========================================
+
+    async def _probe(self, name: str, probe) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(probe(), self.probe_timeout)
+        except asyncio.TimeoutError:
+            # Sem resposta no prazo conta como offline no histórico
+            return {"online": False}
+        except Exception as e:
+            logger.warning(f"Probe '{name}' falhou: {e}")
+            return None
+
+    async def poll_once(self) -> List[ServerStatusSample]:
+        """Executa um ciclo: consulta, aquece o cache, grava amostras e agregados."""
+        probes = status_probes()
+        names = list(probes)
+        results = await asyncio.gather(*(self._probe(name, probes[name]) for name in names))
+
+        now = datetime.now(timezone.utc)
+        samples = []
+        for name, status in zip(names, results):
+            if status is None:
+                continue
+            if "game" in status:
+                status_cache.set(name, status)
+            samples.append(sample_from_status(name, status, now))
+
+        async with self.session_factory() as session:
+            for sample in samples:
+                session.add(sample)
+                await self._add_to_rollups(session, sample)
+            await session.commit()
+
+            if time.monotonic() - self._last_prune > 3600:
+                await self.prune(session, now)
+                self._last_prune = time.monotonic()
+
+        return samples
+
+    async def _add_to_rollups(self, session: AsyncSession, sample: ServerStatusSample):
+        for bucket_seconds in ROLLUP_RETENTION:
+            start = bucket_start(sample.sampled_at, bucket_seconds)
+            rollup = await session.get(ServerStatusRollup, (sample.server, bucket_seconds, start))
+            if rollup is None:
+                rollup = ServerStatusRollup(server=sample.server, bucket_seconds=bucket_seconds, bucket_start=start)
+
+            rollup.samples += 1
+            rollup.online_samples += int(sample.online)
+            rollup.players_sum += sample.players
+            rollup.players_max = max(rollup.players_max, sample.players)
+            if sample.latency_ms is not None:
+                rollup.latency_sum += sample.latency_ms
+                rollup.latency_count += 1
+            session.add(rollup)
+
+    async def prune(self, session: AsyncSession, now: datetime):
+        """Retenção: amostras brutas por pouco tempo, agregados pelo prazo de cada janela."""
+        await session.execute(
+            delete(ServerStatusSample).where(ServerStatusSample.sampled_at < now - self.raw_retention)
+        )
+        for bucket_seconds, keep in ROLLUP_RETENTION.items():
+            await session.execute(
+                delete(ServerStatusRollup).where(
+                    ServerStatusRollup.bucket_seconds == bucket_seconds,
+                    ServerStatusRollup.bucket_start < now - keep,
+                )
+            )
+        await session.commit()
+
+
+# ==========================================
+# LEITURA DO HISTÓRICO
+# ==========================================
+
+async def get_status_history(session: AsyncSession, server: str, window: str) -> Dict[str, Any]:
+    """
+    Série pré-agregada de um servidor para o período pedido ('24h', '7d', '30d').
+    Lê no máximo algumas centenas de linhas de ServerStatusRollup.
+    """
+    span, bucket_seconds = HISTORY_RANGES[window]
+    since = bucket_start(datetime.now(timezone.utc) - span, bucket_seconds)
+
+    statement = (
+        select(ServerStatusRollup)
+        .where(
+            ServerStatusRollup.server == server,
+            ServerStatusRollup.bucket_seconds == bucket_seconds,
+            ServerStatusRollup.bucket_start >= since,
+        )
+        .order_by(ServerStatusRollup.bucket_start)
+    )
+    result = await session.exec(statement)
+    rollups = result.all()
+
+    points = [
+        {
+            "t": r.bucket_start.isoformat(),
+            "uptime": round(r.online_samples / r.samples, 3) if r.samples else None,
+            "players_avg": round(r.players_sum / r.samples, 2) if r.samples else 0,
+            "players_max": r.players_max,
+            "latency_avg": round(r.latency_sum / r.latency_count, 2) if r.latency_count else None,
+        }
+        for r in rollups
+    ]
+    samples = sum(r.samples for r in rollups)
+    online = sum(r.online_samples for r in rollups)
+
+    return {
+        "server": server,
+        "range": window,
+        "bucket_seconds": bucket_seconds,
+        "uptime": round(online / samples, 3) if samples else None,
+        "players_max": max((r.players_max for r in rollups), default=0),
+        "points": points,
+    }
+
+
+async def get_uptime_summary(session: AsyncSession, hours: int = 24) -> Dict[str, Optional[float]]:
+    """Uptime (%) de cada servidor nas últimas horas, para o card do server grid."""
+    since = bucket_start(datetime.now(timezone.utc) - timedelta(hours=hours), 3600)
+
+    statement = select(ServerStatusRollup).where(
+        ServerStatusRollup.bucket_seconds == 3600,
+        ServerStatusRollup.bucket_start >= since,
+    )
+    result = await session.exec(statement)
+
+    totals: Dict[str, List[int]] = {}
+    for rollup in result.all():
+        total = totals.setdefault(rollup.server, [0, 0])
+        total[0] += rollup.online_samples
+        total[1] += rollup.samples
+
+    return {
+        server: round(100 * online / samples, 1) if samples else None
+        for server, (online, samples) in totals.items()
+    }
+
+
+# Instância Global exportada
+status_poller = StatusPoller()
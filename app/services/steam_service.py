@@ -1,41 +1,47 @@
+import asyncio
 import httpx
 import xml.etree.ElementTree as ET
 import json
 import os
+import time
 import aiofiles
+from html.parser import HTMLParser
 from typing import Dict, Any, List, Optional
+from app.core.cache import SWRCache
 from app.core.config import get_settings
-from cachetools import TTLCache, cached
+from app.core.http_clients import http_clients
 
 settings = get_settings()
-# Cache for 15 minutes (900 seconds) in memory
-profile_cache = TTLCache(maxsize=1, ttl=900)
+# Fresh for 15 minutes (900 seconds); after that the last profile is served while it refreshes
+profile_cache = SWRCache(ttl=900, name="steam")
+PROFILE_KEY = "profile"
 CACHE_FILE = "steam_cache.json"
 
-# Global client for reuse
-_shared_client: Optional[httpx.AsyncClient] = None
+# Per-appid achievement counts, persisted separately: they rarely change, so a game
+# is only re-fetched when it was played since its snapshot (or the snapshot expired)
+ACHIEVEMENTS_FILE = "steam_achievements.json"
+achievement_snapshots: Dict[str, Dict[str, Any]] = {}
+
+# Screenshot RSS: items shown on the page and a hard cap on how much of the feed is read
+SCREENSHOT_LIMIT = 4
+SCREENSHOT_RSS_MAX_BYTES = 512 * 1024
 
 async def get_client() -> httpx.AsyncClient:
-    """Returns a shared httpx client instance."""
-    global _shared_client
-    if _shared_client is None or _shared_client.is_closed:
-        _shared_client = httpx.AsyncClient(timeout=10.0)
-    return _shared_client
-
-async def close_client():
-    """Closes the shared client. Should be called on app shutdown."""
-    global _shared_client
-    if _shared_client and not _shared_client.is_closed:
-        await _shared_client.aclose()
+    """Returns the shared Steam client from the app-wide HTTP client registry."""
+    return http_clients.get("steam")
 
 async def get_game_achievements(client: httpx.AsyncClient, appid: int) -> Dict[str, Any]:
     """
     Fetches achievement completion for a specific game.
     Returns {total, achieved, percentage}
     """
+    url = f"http://api.steampowered.com/ISteamUserStats/GetPlayerAchievements/v0001/?appid={appid}&key={settings.STEAM_API_KEY}&steamid={settings.STEAM_ID}"
+    # Network errors, throttling and 5xx propagate, so a failed call is never
+    # stored as "0 achievements" (400/403 = game without stats / private profile)
+    resp = await client.get(url)
+    if resp.status_code == 429 or resp.status_code >= 500:
+        resp.raise_for_status()
     try:
-        url = f"http://api.steampowered.com/ISteamUserStats/GetPlayerAchievements/v0001/?appid={appid}&key={settings.STEAM_API_KEY}&steamid={settings.STEAM_ID}"
-        resp = await client.get(url)
         if resp.status_code != 200:
             return {"total": 0, "achieved": 0, "percentage": 0}
         
@@ -53,105 +59,247 @@ async def get_game_achievements(client: httpx.AsyncClient, appid: int) -> Dict[s
     except Exception:
         return {"total": 0, "achieved": 0, "percentage": 0}
 
-async def get_screenshots(client: httpx.AsyncClient) -> List[Dict[str, str]]:
+class _ImgSrcParser(HTMLParser):
+    """Grabs the first <img src> from an RSS item's description HTML."""
+
+    def __init__(self):
+        super().__init__()
+        self.src: Optional[str] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "img" and self.src is None:
+            self.src = dict(attrs).get("src")
+
+def _image_from_description(description: Optional[str]) -> str:
+    if not description:
+        return ""
+    parser = _ImgSrcParser()
+    parser.feed(description)
+    return parser.src or ""
+
+def _screenshot_from_item(item: ET.Element) -> Optional[Dict[str, str]]:
+    img_url = _image_from_description(item.findtext("description"))
+    if not img_url:
+        return None
+    return {
+        "title": item.findtext("title") or "Screenshot",
+        "link": item.findtext("link") or "#",
+        "image_url": img_url,
+    }
+
+# Last parsed feed, reused while Steam answers 304 Not Modified to its ETag
+_screenshot_feed: Dict[str, Any] = {"etag": None, "last_modified": None, "items": []}
+
+async def get_screenshots(client: httpx.AsyncClient, limit: int = SCREENSHOT_LIMIT) -> List[Dict[str, str]]:
     """
-    Fetches the latest 4 screenshots from the user's RSS feed.
+    Fetches the latest screenshots from the user's RSS feed.
+
+    The body is streamed into an incremental XML parser: reading stops as soon as
+    'limit' items are parsed (or after SCREENSHOT_RSS_MAX_BYTES), so the rest of
+    the feed is never downloaded. Raises on HTTP/parse errors, so the caller
+    can fall back to the last cached screenshots.
     """
-    try:
-        rss_url = f"https://steamcommunity.com/profiles/{settings.STEAM_ID}/screenshots/rss"
-        resp = await client.get(rss_url)
-        if resp.status_code != 200:
-            print(f"Error fetching screenshots: Status {resp.status_code}")
-            return []
-        
-        # Basic sanitization to avoid XML parse errors
-        content = resp.content.decode("utf-8", errors="ignore")
-        root = ET.fromstring(content)
-        screenshots = []
-        
-        for item in root.findall("./channel/item")[:4]:
-            title = item.find("title").text if item.find("title") is not None else "Screenshot"
-            link = item.find("link").text if item.find("link") is not None else "#"
-            description_elem = item.find("description")
-            description = description_elem.text if description_elem is not None else ""
-            
-            # Extract image URL from description HTML
-            img_url = ""
-            if 'src="' in description:
-                try:
-                    start = description.find('src="') + 5
-                    end = description.find('"', start)
-                    img_url = description[start:end]
-                except Exception:
-                    pass
-            
-            if img_url:
-                screenshots.append({
-                    "title": title,
-                    "link": link,
-                    "image_url": img_url
-                })
-        
+    rss_url = f"https://steamcommunity.com/profiles/{settings.STEAM_ID}/screenshots/rss"
+    headers = {}
+    if _screenshot_feed["etag"]:
+        headers["If-None-Match"] = _screenshot_feed["etag"]
+    if _screenshot_feed["last_modified"]:
+        headers["If-Modified-Since"] = _screenshot_feed["last_modified"]
+
+    async with client.stream("GET", rss_url, headers=headers) as resp:
+        if resp.status_code == 304:
+            return _screenshot_feed["items"][:limit]
+        resp.raise_for_status()
+
+        parser = ET.XMLPullParser(events=("end",))
+        screenshots: List[Dict[str, str]] = []
+        received = 0
+        truncated = False
+
+        async for chunk in resp.aiter_bytes():
+            received += len(chunk)
+            if received > SCREENSHOT_RSS_MAX_BYTES:
+                print(f"Screenshot RSS larger than {SCREENSHOT_RSS_MAX_BYTES} bytes; stopped reading.")
+                truncated = True
+                break
+            parser.feed(chunk)
+
+            for _, elem in parser.read_events():
+                if elem.tag != "item":
+                    continue
+                screenshot = _screenshot_from_item(elem)
+                elem.clear()  # Parsed items are not kept in the tree
+                if screenshot:
+                    screenshots.append(screenshot)
+                if len(screenshots) >= limit:
+                    break
+            if len(screenshots) >= limit:
+                break  # Leaving the stream closes the connection; the rest is never read
+
+        # A truncated read is not tied to the ETag, otherwise a 304 would pin the partial list
+        _screenshot_feed.update(
+            etag=None if truncated else resp.headers.get("ETag"),
+            last_modified=None if truncated else resp.headers.get("Last-Modified"),
+            items=screenshots,
+        )
         return screenshots
-    except Exception as e:
-        print(f"Screenshot RSS Error: {e}")
-        return []
 
-async def _save_to_cache(data: Dict[str, Any]):
+async def _save_to_cache(data: Dict[str, Any], path: str = CACHE_FILE):
     """Saves valid data to a local JSON file."""
     try:
-        async with aiofiles.open(CACHE_FILE, mode='w') as f:
+        async with aiofiles.open(path, mode='w') as f:
             await f.write(json.dumps(data, indent=2))
     except Exception as e:
         print(f"Failed to write steam cache: {e}")
 
-async def _load_from_cache() -> Optional[Dict[str, Any]]:
+async def _load_from_cache(path: str = CACHE_FILE) -> Optional[Dict[str, Any]]:
     """Loads data from local JSON file if it exists."""
-    if not os.path.exists(CACHE_FILE):
+    if not os.path.exists(path):
         return None
     try:
-        async with aiofiles.open(CACHE_FILE, mode='r') as f:
+        async with aiofiles.open(path, mode='r') as f:
             content = await f.read()
             return json.loads(content)
     except Exception as e:
         print(f"Failed to read steam cache: {e}")
         return None
 
-@cached(cache=profile_cache)
-async def get_steam_profile() -> Dict[str, Any]:
-    if not settings.STEAM_API_KEY or not settings.STEAM_ID:
-        return {"error": "Steam credentials not configured"}
+async def warm_start_cache():
+    """
+    Seeds the in-memory cache from steam_cache.json at startup.
+    The entry keeps the file's age, so an old snapshot is served right away
+    but refreshed in the background on the first request.
+    """
+    achievement_snapshots.update(await _load_from_cache(ACHIEVEMENTS_FILE) or {})
+
+    data = await _load_from_cache()
+    if not data:
+        return
+    age = max(0.0, time.time() - os.path.getmtime(CACHE_FILE))
+    profile_cache.set(PROFILE_KEY, data, age=age)
+
+def _achievements_are_current(snapshot: Optional[Dict[str, Any]], playtime_2weeks: int) -> bool:
+    """A snapshot is reused while the game's 2-week playtime is unchanged and it is within the TTL."""
+    if not snapshot:
+        return False
+    if snapshot.get("playtime_2weeks") != playtime_2weeks:
+        return False
+    return time.time() - snapshot.get("fetched_at", 0) < settings.STEAM_ACHIEVEMENTS_TTL
+
+def _achievement_counts(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: snapshot.get(key, 0) for key in ("total", "achieved", "percentage")}
+
+async def _refresh_achievements(client: httpx.AsyncClient, appid: int, playtime_2weeks: int) -> Dict[str, Any]:
+    counts = await get_game_achievements(client, appid)
+    achievement_snapshots[str(appid)] = {
+        **counts,
+        "playtime_2weeks": playtime_2weeks,
+        "fetched_at": time.time(),
+    }
+    return counts
+
+async def _get_player_summary(client: httpx.AsyncClient) -> Dict[str, Any]:
+    summary_url = f"http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/?key={settings.STEAM_API_KEY}&steamids={settings.STEAM_ID}"
+    summary_resp = await client.get(summary_url)
+    player_data = summary_resp.json()
+    
+    if "response" not in player_data or "players" not in player_data["response"] or not player_data["response"]["players"]:
+            raise ValueError("Invalid Steam API response")
+    
+    return player_data["response"]["players"][0]
+
+async def _get_steam_level(client: httpx.AsyncClient) -> int:
+    level_url = f"http://api.steampowered.com/IPlayerService/GetSteamLevel/v1/?key={settings.STEAM_API_KEY}&steamid={settings.STEAM_ID}"
+    level_resp = await client.get(level_url)
+    if level_resp.status_code != 200:
+        raise ValueError(f"Steam level status {level_resp.status_code}")
+    return level_resp.json().get("response", {}).get("player_level", 0)
 
+async def _get_recent_games(client: httpx.AsyncClient) -> List[Dict[str, Any]]:
+    recent_url = f"http://api.steampowered.com/IPlayerService/GetRecentlyPlayedGames/v0001/?key={settings.STEAM_API_KEY}&steamid={settings.STEAM_ID}&count=3"
+    recent_resp = await client.get(recent_url)
+    return recent_resp.json().get("response", {}).get("games", [])
+
+# Last measured latency per Steam endpoint (ms), for diagnostics
+endpoint_latency_ms: Dict[str, float] = {}
+
+class _FanOut:
+    """
+    Runs the profile sections concurrently under one shared deadline.
+    A section that fails or misses the deadline returns its fallback
+    (the value from the last good profile) instead of failing the whole fetch.
+    """
+
+    def __init__(self, budget: float):
+        self.deadline = time.monotonic() + budget
+        self.timings_ms: Dict[str, float] = {}
+        self.stale: List[str] = []
+
+    async def run(self, name: str, coro, fallback: Any = None) -> Any:
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(coro, max(0.0, self.deadline - started))
+        except Exception as e:
+            reason = "timeout" if isinstance(e, asyncio.TimeoutError) else e
+            print(f"Steam section '{name}' failed ({reason}); using cached value.")
+            self.stale.append(name)
+            return fallback
+        finally:
+            elapsed = round((time.monotonic() - started) * 1000, 2)
+            self.timings_ms[name] = elapsed
+            endpoint_latency_ms[name] = elapsed
+
+async def _fetch_steam_profile() -> Dict[str, Any]:
+    """
+    Fetches the full profile aggregate from Steam.
+
+    Summary, level, recently played and screenshots are requested at the same
+    time; the achievements of every recent game follow as soon as the recent
+    list arrives. Everything shares one STEAM_FETCH_BUDGET deadline. Raises only if there is no
+    player summary at all (neither fresh nor from the last cached profile).
+    """
     client = await get_client()
-    try:
-        # 1. Get Player Summary
-        summary_url = f"http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/?key={settings.STEAM_API_KEY}&steamids={settings.STEAM_ID}"
-        summary_resp = await client.get(summary_url)
-        player_data = summary_resp.json()
-        
-        if "response" not in player_data or "players" not in player_data["response"] or not player_data["response"]["players"]:
-                raise ValueError("Invalid Steam API response")
-        
-        player = player_data["response"]["players"][0]
+    previous = profile_cache.peek(PROFILE_KEY) or {}
+    fan_out = _FanOut(settings.STEAM_FETCH_BUDGET)
+
+    previous_player = {
+        "personaname": previous.get("username"),
+        "avatarfull": previous.get("avatar_url"),
+        "profileurl": previous.get("profile_url"),
+        "personastate": previous.get("status"),
+    } if previous else None
+
+    async def games_section() -> List[Dict[str, Any]]:
+        # Achievements depend on the recent games list, so they start as soon as it arrives
+        recent_games_data = await fan_out.run("recent_games", _get_recent_games(client))
+        if recent_games_data is None:
+            return previous.get("recent_games", [])
+
+        refreshed: List[int] = []
 
-        # 2. Get Steam Level
-        level_url = f"http://api.steampowered.com/IPlayerService/GetSteamLevel/v1/?key={settings.STEAM_API_KEY}&steamid={settings.STEAM_ID}"
-        level_resp = await client.get(level_url)
-        level = 0
-        if level_resp.status_code == 200:
-            level = level_resp.json().get("response", {}).get("player_level", 0)
+        async def achievements_for(game: Dict[str, Any]) -> Dict[str, Any]:
+            appid = game.get("appid")
+            snapshot = achievement_snapshots.get(str(appid))
+            playtime_2weeks = game.get("playtime_2weeks", 0)
+
+            if _achievements_are_current(snapshot, playtime_2weeks):
+                return _achievement_counts(snapshot)
 
-        # 3. Get Recently Played Games
-        recent_url = f"http://api.steampowered.com/IPlayerService/GetRecentlyPlayedGames/v0001/?key={settings.STEAM_API_KEY}&steamid={settings.STEAM_ID}&count=3"
-        recent_resp = await client.get(recent_url)
-        recent_games_data = recent_resp.json().get("response", {}).get("games", [])
+            refreshed.append(appid)
+            fallback = _achievement_counts(snapshot or {})
+            return await fan_out.run(
+                f"achievements:{appid}",
+                _refresh_achievements(client, appid, playtime_2weeks),
+                fallback,
+            )
+
+        achievements_list = await asyncio.gather(*(achievements_for(game) for game in recent_games_data))
+        if refreshed:
+            await _save_to_cache(achievement_snapshots, ACHIEVEMENTS_FILE)
 
-        # Process Games & Fetch Achievements
         processed_games = []
-        for game in recent_games_data:
+        for game, achievements in zip(recent_games_data, achievements_list):
             appid = game.get("appid")
-            achievements = await get_game_achievements(client, appid)
-            
             playtime_2weeks = round(game.get("playtime_2weeks", 0) / 60, 1)
             playtime_forever = round(game.get("playtime_forever", 0) / 60, 1)
             
@@ -163,30 +311,48 @@ async def get_steam_profile() -> Dict[str, Any]:
                 "icon_url": f"http://media.steampowered.com/steamcommunity/public/images/apps/{appid}/{game.get('img_icon_url')}.jpg",
                 "achievements": achievements
             })
+        return processed_games
 
-        # 4. Get Screenshots
-        screenshots = await get_screenshots(client)
-
-        final_data = {
-            "online": True,
-            "username": player.get("personaname"),
-            "avatar_url": player.get("avatarfull"),
-            "profile_url": player.get("profileurl"),
-            "level": level,
-            "status": player.get("personastate"),
-            "recent_games": processed_games,
-            "screenshots": screenshots
-        }
-        
-        # SUCCESS: Save to file cache
-        await _save_to_cache(final_data)
-        
-        return final_data
+    # Every independent call at once; the total is bounded by the slowest chain, not the sum
+    player, level, processed_games, screenshots = await asyncio.gather(
+        fan_out.run("summary", _get_player_summary(client), previous_player),
+        fan_out.run("level", _get_steam_level(client), previous.get("level", 0)),
+        games_section(),
+        fan_out.run("screenshots", get_screenshots(client), previous.get("screenshots", [])),
+    )
+    if player is None:
+        raise ValueError("Steam player summary unavailable")
 
-    except Exception as e:
-        print(f"Steam API Failed: {e}. Trying fallback cache.")
-        cached_data = await _load_from_cache()
-        if cached_data:
-            return cached_data
-        
-        return {"online": False, "error": "Steam unreachable and no cache found."}
+    final_data = {
+        "online": True,
+        "username": player.get("personaname"),
+        "avatar_url": player.get("avatarfull"),
+        "profile_url": player.get("profileurl"),
+        "level": level,
+        "status": player.get("personastate"),
+        "recent_games": processed_games,
+        "screenshots": screenshots,
+        "timings_ms": fan_out.timings_ms,
+        "stale_sections": fan_out.stale,
+    }
+    
+    # SUCCESS: Save to file cache (warm start for the next boot)
+    await _save_to_cache(final_data)
+    
+    return final_data
+
+async def get_steam_profile() -> Dict[str, Any]:
+    """
+    Steam profile aggregate, served from profile_cache.
+    Concurrent callers share one in-flight fetch; once the TTL expires the last
+    good profile is returned immediately while a refresh runs in the background.
+    """
+    if not settings.STEAM_API_KEY or not settings.STEAM_ID:
+        return {"error": "Steam credentials not configured"}
+
+    data = await profile_cache.get(PROFILE_KEY, _fetch_steam_profile)
+    if data is not None:
+        return data
+
+    # First fetch failed and there was no warm-start file either
+    return {"online": False, "error": "Steam unreachable and no cache found."}
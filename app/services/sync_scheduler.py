@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import update
+from sqlmodel import select
+
+from app.core.config import get_settings
+from app.database import async_session
+from app.models import SyncJob
+from app.services.lease_lock import LeaseLock
+from app.services.project_sync import ProjectSyncService
+
+logger = logging.getLogger(__name__)
+
+# Sem aviso local, o worker ainda olha a tabela a cada tanto (jobs de processos que morreram)
+CLAIM_POLL_INTERVAL = 30.0
+
+
+class SyncScheduler:
+    """
+    Executa o sync do GitHub em background, fora do ciclo de request.
+
+    - Jobs ficam na tabela SyncJob (qualquer worker responde o status).
+    - A fila é a própria tabela: o worker reivindica o job 'queued' mais antigo
+      com um UPDATE condicional. Um job enfileirado por um processo que morreu
+      é executado por outro worker (ou pelo próximo a subir), em vez de ficar órfão.
+    - Um job preso em 'running' (worker morreu no meio) é marcado como 'failed'
+      quando o lock está livre e ele começou há mais que o TTL do lock.
+    - Um loop periódico enfileira syncs a cada GITHUB_SYNC_INTERVAL ± jitter.
+    - Um LeaseLock garante um único sync por vez, mesmo com vários workers.
+
+    Iniciado/parado pelo lifespan em app/main.py.
+    """
+
+    def __init__(self, session_factory=async_session):
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.interval = settings.GITHUB_SYNC_INTERVAL
+        self.jitter = settings.GITHUB_SYNC_JITTER
+        self.lock = LeaseLock(ProjectSyncService.STATE_NAME, settings.GITHUB_SYNC_LOCK_TTL, session_factory)
+
+        # Acorda o worker local logo após um enqueue (sem esperar o polling)
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    # ==========================================
+    # CICLO DE VIDA
+    # ==========================================
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self._worker()))
+        if self.interval > 0:
+            self._tasks.append(asyncio.create_task(self._periodic()))
+        logger.info(f"Sync scheduler iniciado (intervalo={self.interval}s, jitter={self.jitter:.0%}).")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    # ==========================================
+    # API PÚBLICA
+    # ==========================================
+
+    async def enqueue(self, full: bool = False, trigger: str = "manual") -> SyncJob:
+        """
+        Enfileira um sync e retorna o job.
+        Se já existe um job recente na fila ou rodando, ele é reaproveitado.
+        """
+        await self._reap_stale_jobs()  # Um job morto em 'running' não pode segurar a deduplicação
+
+        recent = datetime.now(timezone.utc) - timedelta(seconds=self.lock.ttl)
+        async with self.session_factory() as session:
+            statement = (
+                select(SyncJob)
+                .where(SyncJob.status.in_(["queued", "running"]), SyncJob.created_at > recent)
+                .order_by(SyncJob.created_at.desc())
+            )
+            result = await session.exec(statement)
+            pending = result.first()
+            if pending and (pending.full or not full):
+                return pending
+
+            job = SyncJob(id=uuid.uuid4().hex, full=full, trigger=trigger)
+            session.add(job)
+            await session.commit()
+
+        self._wakeup.set()
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[SyncJob]:
+        async with self.session_factory() as session:
+            return await session.get(SyncJob, job_id)
+
+    # ==========================================
+    # LOOPS INTERNOS
+    # ==========================================
+
+    def _next_delay(self, first: bool = False) -> float:
+        """Intervalo com jitter para os workers não dispararem juntos."""
+        spread = self.interval * self.jitter
+        if first:
+            # Logo após o deploy: sync cedo, mas espalhado entre os workers
+            return random.uniform(0, spread) if spread else 0
+        return max(1.0, self.interval + random.uniform(-spread, spread))
+
+    async def _periodic(self):
+        delay = self._next_delay(first=True)
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.enqueue(trigger="schedule")
+            except Exception:
+                logger.exception("Falha ao agendar sync periódico.")
+            delay = self._next_delay()
+
+    async def _reap_stale_jobs(self) -> int:
+        """
+        Falha os jobs presos em 'running' cujo worker morreu.
+        Um sync vivo renova o LeaseLock pelo heartbeat: com o lock livre, um job
+        iniciado há mais que o TTL não vai mais terminar.
+        """
+        if await self.lock.is_held():
+            return 0
+
+        now = datetime.now(timezone.utc)
+        stale = now - timedelta(seconds=self.lock.ttl)
+        async with self.session_factory() as session:
+            statement = (
+                update(SyncJob)
+                .where(SyncJob.status == "running", SyncJob.started_at < stale)
+                .values(status="failed", error="Worker interrompido antes de terminar.", finished_at=now)
+            )
+            result = await session.execute(statement)
+            await session.commit()
+
+        if result.rowcount:
+            logger.warning(f"{result.rowcount} job(s) de sync presos em 'running' marcados como falhos.")
+        return result.rowcount
+
+    async def _claim_next(self) -> Optional[str]:
+        """
+        Reivindica o job 'queued' mais antigo (queued -> running).
+        O UPDATE condicional garante que só um worker fica com cada job.
+        """
+        async with self.session_factory() as session:
+            while True:
+                statement = (
+                    select(SyncJob.id)
+                    .where(SyncJob.status == "queued")
+                    .order_by(SyncJob.created_at)
+                    .limit(1)
+                )
+                result = await session.exec(statement)
+                job_id = result.first()
+                if job_id is None:
+                    return None
+
+                claim = (
+                    update(SyncJob)
+                    .where(SyncJob.id == job_id, SyncJob.status == "queued")
+                    .values(status="running", started_at=datetime.now(timezone.utc))
+                )
+                claimed = await session.execute(claim)
+                await session.commit()
+                if claimed.rowcount == 1:
+                    return job_id
+                # Outro worker levou este; tenta o próximo
+
+    async def _worker(self):
+        while True:
+            # Limpa antes de consultar: um enqueue durante a consulta não se perde
+            self._wakeup.clear()
+            try:
+                await self._reap_stale_jobs()
+                job_id = await self._claim_next()
+            except Exception:
+                logger.exception("Falha ao buscar job de sync na fila.")
+                job_id = None
+
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), CLAIM_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run_job(job_id)
+            except Exception:
+                logger.exception(f"Erro inesperado no job de sync {job_id}.")
+
+    async def _update_job(self, job_id: str, **values):
+        async with self.session_factory() as session:
+            job = await session.get(SyncJob, job_id)
+            if job is None:
+                return
+            for key, value in values.items():
+                setattr(job, key, value)
+            session.add(job)
+            await session.commit()
+
+    async def _run_job(self, job_id: str):
+        """Executa um job já reivindicado (status 'running')."""
+        job = await self.get_job(job_id)
+        if job is None:
+            return
+
+        async with self.lock.hold() as acquired:
+            if not acquired:
+                await self._update_job(
+                    job_id,
+                    status="skipped",
+                    error="Outro processo já está sincronizando.",
+                    finished_at=datetime.now(timezone.utc),
+                )
+                return
+
+            try:
+                async with self.session_factory() as session:
+                    result = await ProjectSyncService(session, full=job.full).run()
+                await self._update_job(
+                    job_id, status="done", result=result, finished_at=datetime.now(timezone.utc)
+                )
+            except Exception as e:
+                logger.exception(f"Sync {job_id} falhou.")
+                await self._update_job(
+                    job_id, status="failed", error=str(e), finished_at=datetime.now(timezone.utc)
+                )
+
+
+# Instância Global exportada
+sync_scheduler = SyncScheduler()
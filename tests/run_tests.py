@@ -1,16 +1,157 @@
 import unittest
 import httpx
 import asyncio
+import io
+import struct
 import sys
 import os
+import tempfile
+import zlib
+from contextlib import asynccontextmanager
+from pathlib import Path
 
 # Add parent directory to path to import app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.main import app
+from app.database import create_engine_from_url, init_db
+from app.models import Article, ChatSummary, Project, SyncJob
+from app.core.config import get_settings
+from app.services.chat_service import ChatService
+from app.core.pagination import decode_cursor, encode_cursor
+from app.routers.blog import BlogService
+from app.services.project_listing import list_projects_page
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.services.lease_lock import LeaseLock
+from app.services.sync_scheduler import SyncScheduler
+from datetime import datetime, timedelta, timezone
+from app.services.render_cache import RenderCache
+from app.core.cache import SWRCache
+from app.services.response_cache import ResponseCache
+from app.services.markdown_service import MarkdownRenderer, README_EXTENSIONS
+from app.core.http_clients import http_clients
+from app.services import image_proxy as image_proxy_module
+from app.services.image_proxy import ImageProxy, ImageProxyError, is_allowed
+from app.services.a2s_client import A2SClient, HEADER_MULTI, HEADER_SIMPLE
+from a2s.exceptions import BrokenMessageError
+from app.services.discord_service import DiscordCache, DiscordRateLimited
+from app.services.gemini_scheduler import CircuitBreaker, GeminiBusy, GeminiScheduler, GeminiUnavailable
+from google.genai import errors as genai_errors
+
+
+def make_scheduler(**overrides) -> GeminiScheduler:
+    """Scheduler com quota folgada e sem espera entre retries (ajustável por teste)."""
+    options = dict(
+        rpm=600, tpm=1_000_000, max_queue=10, queue_timeout=1.0, max_attempts=3,
+        backoff_base=0.0, backoff_max=0.0, breaker_threshold=3, breaker_cooldown=60.0,
+    )
+    options.update(overrides)
+    return GeminiScheduler(**options)
+
+
+async def memory_session_factory():
+    """Banco SQLite em memória só para o teste (não toca no database.db)."""
+    engine = create_engine_from_url("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def api_error(code: int) -> genai_errors.APIError:
+    return genai_errors.APIError(code, {"error": {"message": "test", "status": str(code)}})
+
+
+@asynccontextmanager
+async def mock_http_client(name: str, handler, base_url: str = ""):
+    """Troca o cliente `name` do http_clients por um httpx.MockTransport durante o bloco."""
+    previous = http_clients._clients.get(name)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=base_url, follow_redirects=False)
+    http_clients._clients[name] = client
+    try:
+        yield client
+    finally:
+        await client.aclose()
+        if previous is None:
+            http_clients._clients.pop(name, None)
+        else:
+            http_clients._clients[name] = previous
+
+
+def png_bytes(width: int = 300, height: int = 200) -> bytes:
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 10, 10)).save(out, "PNG")
+    return out.getvalue()
+
+
+def png_claiming_size(width: int, height: int) -> bytes:
+    """PNG de 1x1 cujo cabeçalho IHDR declara outro tamanho (Pillow só lê o cabeçalho ao abrir)."""
+    data = bytearray(png_bytes(1, 1))
+    ihdr = bytes(data[12:16]) + struct.pack(">II", width, height) + bytes(data[24:29])
+    data[16:24] = struct.pack(">II", width, height)
+    data[29:33] = struct.pack(">I", zlib.crc32(ihdr))
+    return bytes(data)
+
+
+# Resposta A2S_INFO mínima (Source): nome, mapa, pasta, jogo, app id, 3/10 jogadores...
+A2S_INFO_REPLY = (
+    b"\x49\x11" + b"Srv\x00" + b"map\x00" + b"folder\x00" + b"Game\x00" + struct.pack("<h", 0)
+    + bytes([3, 10, 0]) + b"d" + b"l" + bytes([0, 1]) + b"1.0\x00" + b"\x00"
+)
+A2S_CHALLENGE = 0x1234
+
+
+class FakeA2SServer(asyncio.DatagramProtocol):
+    """
+    Servidor A2S falso: exige challenge e responde conforme `mode`
+    (simple | split | compressed | silent).
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.requests = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.requests.append(data)
+        if self.mode == "silent":
+            return
+        if not data.endswith(struct.pack("<l", A2S_CHALLENGE)):
+            self.transport.sendto(HEADER_SIMPLE + b"A" + struct.pack("<l", A2S_CHALLENGE), addr)
+            return
+
+        body = HEADER_SIMPLE + A2S_INFO_REPLY
+        if self.mode == "simple":
+            self.transport.sendto(body, addr)
+            return
+        # Bit 15 ligado no id não é compressão; só o bit mais alto é
+        message_id = 0x00008001 if self.mode == "split" else 0x80000001
+        half = len(body) // 2
+        for number, part in reversed(list(enumerate([body[:half], body[half:]]))):
+            self.transport.sendto(HEADER_MULTI + struct.pack("<IBBH", message_id, 2, number, 1248) + part, addr)
+
+
+def image_handler(hits: list, body: bytes):
+    """Origem falsa: github.com redireciona para o CDN; /evil redireciona para fora da lista."""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        hits.append(str(request.url))
+        await asyncio.sleep(0.02)
+        if request.url.host == "github.com":
+            return httpx.Response(302, headers={"Location": "https://avatars.githubusercontent.com/u/1"})
+        if request.url.path == "/evil":
+            return httpx.Response(302, headers={"Location": "http://169.254.169.254/latest"})
+        return httpx.Response(200, headers={"content-type": "image/png"}, content=body)
+    return handler
+
 
 class TestPortfolio(unittest.IsolatedAsyncioTestCase):
     async def asyncSetUp(self):
+        # ASGITransport não dispara o lifespan, então criamos as tabelas aqui
+        await init_db()
         transport = httpx.ASGITransport(app=app)
         self.client = httpx.AsyncClient(transport=transport, base_url="http://test")
 
@@ -38,6 +179,511 @@ class TestPortfolio(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(response.status_code, 200)
         print("✅ Project Sync (/projects/sync) passed")
 
+    async def test_render_cache_byte_budget(self):
+        """Test if the render cache evicts by memory budget, not entry count."""
+        cache = RenderCache(max_bytes=300)
+        for article_id in range(3):
+            await cache.set((article_id, "digest"), "x" * 100)
+        self.assertIsNone(await cache.get((0, "digest")))
+        self.assertIsNotNone(await cache.get((2, "digest")))
+        self.assertLessEqual(cache.stats()["bytes"], 300)
+        self.assertEqual(cache.stats()["hits"], 1)
+        print("✅ Render cache byte budget passed")
+
+    async def test_swr_cache_single_flight(self):
+        """Test if concurrent misses share one load and slow loads fall back."""
+        cache = SWRCache(ttl=60)
+        calls = 0
+
+        async def slow_loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.2)
+            return "fresh"
+
+        results = await asyncio.gather(*[
+            cache.get("key", slow_loader, timeout=0.05, default="fallback") for _ in range(10)
+        ])
+        self.assertEqual(calls, 1)
+        self.assertEqual(set(results), {"fallback"})
+        await asyncio.sleep(0.3)
+        self.assertEqual(await cache.get("key", slow_loader), "fresh")
+        self.assertEqual(calls, 1)
+        print("✅ SWR cache single-flight passed")
+
+    async def test_response_cache_near_duplicates(self):
+        """Test if rephrased questions hit the cache and unrelated ones do not."""
+        cache = ResponseCache(ttl=60, threshold=0.8, max_entries=10)
+        cache.store("Qual é a sua stack?", "Python e FastAPI")
+
+        self.assertEqual(cache.lookup("qual e a sua stack"), "Python e FastAPI")
+        self.assertEqual(cache.lookup("Como faço pra entrar em contato?"), None)
+        self.assertEqual(cache.lookup("Qual é a sua stack?", lang="en"), None)
+
+        cache.store("Como faço para entrar em contato?", "Pelo formulário")
+        self.assertEqual(cache.lookup("Como faço pra entrar em contato?"), "Pelo formulário")
+        self.assertEqual(cache.stats()["near_hits"], 1)
+        print("✅ Response cache near-duplicate matching passed")
+
+    async def test_response_cache_rejects_different_meaning(self):
+        """Test if long questions differing by one content word or a negation miss the cache."""
+        cache = ResponseCache(ttl=60, threshold=0.8, max_entries=10)
+        cache.store("Quais tecnologias você usa no backend dos seus projetos pessoais?", "FastAPI e SQLModel")
+        cache.store("Você tem experiência com Kubernetes em produção?", "Sim, há dois anos")
+
+        self.assertEqual(cache.lookup("Quais tecnologias você usa no frontend dos seus projetos pessoais?"), None)
+        self.assertEqual(cache.lookup("Você não tem experiência com Kubernetes em produção?"), None)
+        self.assertEqual(cache.lookup("Quais tecnologias voce usa no backend dos seus projeto pessoais"), "FastAPI e SQLModel")
+        self.assertEqual(cache.stats()["misses"], 2)
+        print("✅ Response cache word veto passed")
+
+    async def test_markdown_timeout_spares_concurrent_render(self):
+        """Test if a hung render only blacklists itself and a concurrent render survives the pool recycle."""
+        renderer = MarkdownRenderer()
+        renderer.workers, renderer.timeout = 2, 2.0
+        slow = "```python\nprint(1)\n```\n" * 40000  # ~10s
+        medium = "```python\nprint(2)\n```\n" * 2000  # ~0.5s
+        try:
+            # Sobe os dois workers antes de medir
+            await asyncio.gather(*[renderer.try_render(f"# warm {i}", README_EXTENSIONS) for i in range(2)])
+
+            async def medium_during_timeout():
+                await asyncio.sleep(1.7)  # ainda renderizando quando o slow estoura e o pool é reciclado
+                return await renderer.try_render(medium, README_EXTENSIONS)
+
+            slow_result, medium_result = await asyncio.gather(
+                renderer.try_render(slow, README_EXTENSIONS), medium_during_timeout()
+            )
+            self.assertIsNone(slow_result)
+            self.assertIn("print", medium_result)
+            self.assertTrue(renderer._recently_failed(renderer._failure_key(slow, README_EXTENSIONS)))
+            self.assertFalse(renderer._recently_failed(renderer._failure_key(medium, README_EXTENSIONS)))
+            self.assertIsNone(await renderer.try_render(slow, README_EXTENSIONS))  # sem renderizar de novo
+        finally:
+            renderer.shutdown()
+        print("✅ Markdown timeout isolation passed")
+
+    async def test_image_proxy_allow_list_and_redirects(self):
+        """Test if only allowed hosts are fetched, also across redirects, and bad images fall back."""
+        self.assertTrue(is_allowed("https://avatars.steamstatic.com/a.jpg"))
+        self.assertFalse(is_allowed("https://example.com/a.png"))
+        self.assertFalse(is_allowed("file:///etc/passwd"))
+        response = await self.client.get("/img", params={"url": "https://example.com/x.png"})
+        self.assertEqual(response.status_code, 400)
+
+        hits = []
+        with tempfile.TemporaryDirectory() as cache_dir:
+            proxy = ImageProxy(cache_dir, max_bytes=10**6, max_source_bytes=10**6, ttl=60, max_age=60)
+            async with mock_http_client("images", image_handler(hits, png_bytes())):
+                path, media_type = await proxy.get("https://github.com/someone.png", 64, "webp")
+                self.assertTrue(path.exists())
+                self.assertEqual(media_type, "image/webp")
+                self.assertEqual(hits, ["https://github.com/someone.png", "https://avatars.githubusercontent.com/u/1"])
+
+                with self.assertRaises(ImageProxyError):
+                    await proxy.get("https://cdn.discordapp.com/evil", 64, "webp")
+                self.assertNotIn("http://169.254.169.254/latest", hits)
+
+            # Cabeçalho gigante: Pillow recusa ao abrir; a rota redireciona para a original
+            async with mock_http_client("images", image_handler([], png_claiming_size(30000, 30000))):
+                url = "https://cdn.discordapp.com/bomb.png"
+                with self.assertRaises(ImageProxyError):
+                    await proxy.get(url, 64, "webp")
+                response = await self.client.get("/img", params={"url": url, "w": 64})
+                self.assertEqual(response.status_code, 302)
+                self.assertEqual(response.headers["location"], url)
+        print("✅ Image proxy allow-list and redirects passed")
+
+    async def test_image_proxy_single_download_and_lru(self):
+        """Test if concurrent requests share one download and the disk LRU stays within budget."""
+        hits = []
+        with tempfile.TemporaryDirectory() as cache_dir:
+            proxy = ImageProxy(cache_dir, max_bytes=10**6, max_source_bytes=10**6, ttl=60, max_age=60)
+            async with mock_http_client("images", image_handler(hits, png_bytes())):
+                url = "https://avatars.steamstatic.com/fef49e7fa7e1997310d705b2a6158ff8dc1cdfeb_full.jpg"
+                results = await asyncio.gather(*[proxy.get(url, 128, "webp") for _ in range(5)])
+                self.assertEqual(len(hits), 1)
+                self.assertEqual(len({path for path, _ in results}), 1)
+
+                first = results[0][0]
+                variant_size = first.stat().st_size
+                proxy.max_bytes = variant_size * 3
+                os.utime(first, (1, first.stat().st_mtime))  # o menos acessado
+                for i in range(3):
+                    await proxy.get(f"https://cdn.discordapp.com/icons/{i}.png", 128, "webp")
+
+                on_disk = list(proxy.cache_dir.rglob("*.*"))
+                self.assertFalse(first.exists())
+                self.assertLessEqual(proxy._size, proxy.max_bytes)
+                self.assertEqual(proxy._size, sum(f.stat().st_size for f in on_disk))
+        print("✅ Image proxy single download and LRU passed")
+
+    async def test_image_proxy_etag_revalidation(self):
+        """Test if non content-addressed images revalidate via ETag and hashed ones are immutable."""
+        proxy = image_proxy_module.image_proxy
+        original_dir, original_size = proxy.cache_dir, proxy._size
+        with tempfile.TemporaryDirectory() as cache_dir:
+            proxy.cache_dir, proxy._size = Path(cache_dir), None
+            try:
+                async with mock_http_client("images", image_handler([], png_bytes())):
+                    accept = {"accept": "image/webp"}
+                    response = await self.client.get("/img", params={"url": "https://github.com/someone.png", "w": 64}, headers=accept)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.headers["cache-control"], f"public, max-age={proxy.max_age}")
+                    etag = response.headers["etag"]
+
+                    response = await self.client.get(
+                        "/img", params={"url": "https://github.com/someone.png", "w": 64},
+                        headers={**accept, "if-none-match": etag},
+                    )
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.content, b"")
+
+                    hashed = "https://avatars.steamstatic.com/fef49e7fa7e1997310d705b2a6158ff8dc1cdfeb_full.jpg"
+                    response = await self.client.get("/img", params={"url": hashed, "w": 64}, headers=accept)
+                    self.assertIn("immutable", response.headers["cache-control"])
+            finally:
+                proxy.cache_dir, proxy._size = original_dir, original_size
+        print("✅ Image proxy ETag revalidation passed")
+
+    async def test_sync_enqueue_dedup(self):
+        """Test if enqueue reuses a pending job and only a full sync supersedes a partial one."""
+        scheduler = SyncScheduler(await memory_session_factory())  # sem start(): os jobs ficam na fila
+
+        first = await scheduler.enqueue()
+        self.assertEqual((await scheduler.enqueue()).id, first.id)
+
+        full = await scheduler.enqueue(full=True)
+        self.assertNotEqual(full.id, first.id)
+        self.assertEqual((await scheduler.enqueue()).id, full.id)
+        self.assertEqual((await scheduler.enqueue(full=True)).id, full.id)
+        print("✅ Sync enqueue dedup passed")
+
+    async def test_sync_claim_and_reap(self):
+        """Test if a queued job is claimed by exactly one worker and dead running jobs are failed."""
+        session_factory = await memory_session_factory()
+        a, b = SyncScheduler(session_factory), SyncScheduler(session_factory)
+        job = await a.enqueue()
+
+        claims = await asyncio.gather(a._claim_next(), b._claim_next())
+        self.assertCountEqual(claims, [None, job.id])
+        self.assertEqual((await a.get_job(job.id)).status, "running")
+
+        # Worker morreu há mais que o TTL do lock: o job não pode segurar a fila
+        async with session_factory() as session:
+            stuck = await session.get(SyncJob, job.id)
+            stuck.started_at = stuck.created_at = datetime.now(timezone.utc) - timedelta(seconds=a.lock.ttl * 2)
+            session.add(stuck)
+            await session.commit()
+        self.assertFalse(await a.lock.is_held())
+
+        fresh = await a.enqueue()
+        self.assertNotEqual(fresh.id, job.id)
+        self.assertEqual((await a.get_job(job.id)).status, "failed")
+        print("✅ Sync job claim and reaper passed")
+
+    async def test_lease_lock_expiry(self):
+        """Test if a lease lock is exclusive until its TTL expires and then moves to another owner."""
+        session_factory = await memory_session_factory()
+        first = LeaseLock("test-lock", ttl=0.3, session_factory=session_factory)
+        second = LeaseLock("test-lock", ttl=0.3, session_factory=session_factory)
+
+        self.assertTrue(await first.acquire())
+        self.assertTrue(await first.acquire())  # renovação pelo dono
+        self.assertFalse(await second.acquire())
+        self.assertTrue(await second.is_held())
+
+        await asyncio.sleep(0.4)  # dono "morreu": o prazo vence sem heartbeat
+        self.assertTrue(await second.acquire())
+        self.assertFalse(await first.acquire())
+
+        await second.release()
+        self.assertFalse(await first.is_held())
+        print("✅ Lease lock expiry passed")
+
+    async def test_discord_rate_limit_backoff(self):
+        """Test if Discord rate-limit headers and 429s stop requests and serve the last good response."""
+        cache = DiscordCache(ttl=0)  # sem TTL: só o rate limit segura as requests
+        requests = []
+        replies = {
+            "/guilds/1/widget.json": [
+                httpx.Response(200, json={"name": "v1"}, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.2"}),
+                httpx.Response(429, json={"retry_after": 0.5, "global": False}, headers={"Retry-After": "1"}),
+            ],
+            "/guilds/2/widget.json": [
+                httpx.Response(429, json={"retry_after": 2.0, "global": True}),
+            ],
+        }
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request.url.path)
+            return replies[request.url.path].pop(0)
+
+        async with mock_http_client("discord", handler, base_url="https://discord.test"):
+            path = "/guilds/1/widget.json"
+            self.assertEqual(await cache.get_json(path), {"name": "v1"})
+            # X-RateLimit-Remaining: 0 -> espera o Reset-After, servindo a última resposta
+            self.assertEqual(await cache.get_json(path), {"name": "v1"})
+            self.assertEqual(len(requests), 1)
+
+            await asyncio.sleep(0.25)
+            # 429 com Retry-After: resposta antiga e bloqueio de pelo menos 1s
+            self.assertEqual(await cache.get_json(path), {"name": "v1"})
+            self.assertEqual(len(requests), 2)
+            self.assertGreater(cache._retry_in(path), 0.9)
+
+            # 429 global sem nada em cache: erro, e todos os paths ficam bloqueados
+            with self.assertRaises(DiscordRateLimited) as raised:
+                await cache.get_json("/guilds/2/widget.json")
+            self.assertGreaterEqual(raised.exception.retry_after, 1.9)
+            self.assertEqual(await cache.get_json(path), {"name": "v1"})
+            self.assertEqual(len(requests), 3)
+        print("✅ Discord rate-limit backoff passed")
+
+    async def _a2s_query(self, client: A2SClient, mode: str, timeout: float = 1.0):
+        loop = asyncio.get_running_loop()
+        transport, server = await loop.create_datagram_endpoint(
+            lambda: FakeA2SServer(mode), local_addr=("127.0.0.1", 0)
+        )
+        try:
+            port = transport.get_extra_info("sockname")[1]
+            return server, await client.info(("127.0.0.1", port), timeout=timeout)
+        finally:
+            transport.close()
+
+    async def test_a2s_challenge_and_split_packets(self):
+        """Test the A2S challenge round-trip and split-packet reassembly (out of order)."""
+        client = A2SClient()
+        try:
+            for mode in ("simple", "split"):
+                server, info = await self._a2s_query(client, mode)
+                self.assertEqual((info.server_name, info.map_name, info.player_count), ("Srv", "map", 3))
+                self.assertEqual(len(server.requests), 2)  # pedido + pedido com o challenge
+            self.assertEqual(client._pending, {})
+        finally:
+            client.close()
+        print("✅ A2S challenge and split packets passed")
+
+    async def test_a2s_rejects_compressed_and_cleans_timeouts(self):
+        """Test if compressed split replies are rejected and timed-out queries leave no pending entry."""
+        client = A2SClient()
+        try:
+            with self.assertRaises(BrokenMessageError):
+                await self._a2s_query(client, "compressed")
+            with self.assertRaises(asyncio.TimeoutError):
+                await self._a2s_query(client, "silent", timeout=0.2)
+            await asyncio.sleep(0)  # callbacks do future cancelado rodam na próxima volta do loop
+            self.assertEqual(client._pending, {})
+        finally:
+            client.close()
+        print("✅ A2S compressed rejection and timeout cleanup passed")
+
+    async def test_decode_cursor_rejects_wrong_types(self):
+        """Test if cursors with the wrong size or value types are treated as no cursor."""
+        published = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor(5, 10), types=(int, int)), [5, 10])
+        self.assertEqual(decode_cursor(encode_cursor(published, 3), types=(datetime, int)), [published, 3])
+
+        for bad in (encode_cursor("x", {}), encode_cursor(True, 1), encode_cursor(5), encode_cursor(5.5, 1), "!!!", "bm90IGpzb24"):
+            self.assertIsNone(decode_cursor(bad, types=(int, int)), bad)
+        self.assertIsNone(decode_cursor(encode_cursor("ontem", 1), types=(datetime, int)))
+        self.assertIsNone(decode_cursor(encode_cursor(20240501, 1), types=(datetime, int)))
+        print("✅ Cursor type validation passed")
+
+    async def test_projects_keyset_pagination(self):
+        """Test projects paging by (stars, id): every project once, ties broken by id, bad cursor restarts."""
+        session_factory = await memory_session_factory()
+        stars = [50, 10, 10, 10, 30, 0, 10, 50]
+        async with session_factory() as session:
+            for i, count in enumerate(stars):
+                session.add(Project(name=f"p{i}", url=f"https://github.com/u/p{i}", stars=count))
+            await session.commit()
+
+            expected = [p.name for p in sorted(
+                (await session.exec(select(Project))).all(), key=lambda p: (p.stars, p.id), reverse=True
+            )]
+
+            seen, cursor, pages = [], None, 0
+            while True:
+                projects, cursor = await list_projects_page(session, cursor, limit=3)
+                seen += [p.name for p in projects]
+                pages += 1
+                if cursor is None:
+                    break
+            self.assertEqual(seen, expected)
+            self.assertEqual(pages, 3)
+
+            first_page, _ = await list_projects_page(session, None, limit=3)
+            for bad in (encode_cursor("x", {}), "lixo"):
+                restarted, _ = await list_projects_page(session, bad, limit=3)
+                self.assertEqual([p.id for p in restarted], [p.id for p in first_page])
+        print("✅ Projects keyset pagination passed")
+
+    async def test_blog_keyset_pagination(self):
+        """Test blog paging by (published_at, id) over published articles only."""
+        session_factory = await memory_session_factory()
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        async with session_factory() as session:
+            for i in range(BlogService.PAGE_SIZE + 3):
+                # Pares com a mesma data: o id desempata
+                session.add(Article(
+                    title=f"a{i}", slug=f"a{i}", content="x", summary="x",
+                    published_at=base + timedelta(days=i // 2), is_published=True,
+                ))
+            session.add(Article(title="draft", slug="draft", content="x", summary="x", is_published=False))
+            await session.commit()
+
+            first, cursor = await BlogService.get_page(session, None)
+            self.assertEqual(len(first), BlogService.PAGE_SIZE)
+            self.assertEqual(first[0].title, f"a{BlogService.PAGE_SIZE + 2}")
+            self.assertIsNotNone(cursor)
+
+            last, end = await BlogService.get_page(session, cursor)
+            self.assertEqual(len(last), 3)
+            self.assertIsNone(end)
+            titles = [a.title for a in first + last]
+            self.assertEqual(len(set(titles)), BlogService.PAGE_SIZE + 3)
+            self.assertNotIn("draft", titles)
+
+            restarted, _ = await BlogService.get_page(session, encode_cursor("ontem", 1))
+            self.assertEqual([a.id for a in restarted], [a.id for a in first])
+        print("✅ Blog keyset pagination passed")
+
+    async def test_chat_context_folds_every_old_message(self):
+        """Test if messages beyond any fixed scan window still reach the rolling summary."""
+        session_factory = await memory_session_factory()
+        async with session_factory() as session:
+            chat = ChatService(session)
+            for i in range(80):
+                await chat.save_message("long-chat", "visitor", f"m{i}")
+
+            # Orçamento que só deixa poucas mensagens inteiras fora do resumo
+            context = await chat.get_context_for_ai("long-chat", token_budget=get_settings().CHAT_SUMMARY_TOKEN_BUDGET + 10)
+            summary_lines = context[0].message.splitlines()[1:]
+            kept = [msg.message for msg in context[1:]]
+
+            self.assertEqual(summary_lines[0], "Visitante: m0")
+            self.assertEqual(kept[-1], "m79")
+            self.assertEqual([line.split(": ")[1] for line in summary_lines] + kept, [f"m{i}" for i in range(80)])
+
+            summary = await session.get(ChatSummary, "long-chat")
+            self.assertEqual(summary.covered_until_id, context[1].id - 1)
+        print("✅ Chat context summary coverage passed")
+
+    async def test_gemini_breaker_opens_after_threshold(self):
+        """Test if the circuit opens after `threshold` retryable failures and then fails fast."""
+        scheduler = make_scheduler(breaker_threshold=3)
+        calls = 0
+
+        async def overloaded():
+            nonlocal calls
+            calls += 1
+            raise api_error(503)
+
+        with self.assertRaises(genai_errors.APIError):
+            await scheduler.run("s1", 10, overloaded)  # 3 tentativas = 3 falhas
+        self.assertEqual(scheduler.breaker.state, "open")
+
+        with self.assertRaises(GeminiUnavailable):
+            await scheduler.run("s1", 10, overloaded)
+        self.assertEqual(calls, 3)
+        await scheduler.close()
+        print("✅ Gemini circuit breaker opening passed")
+
+    async def test_gemini_breaker_half_open_probe(self):
+        """Test if exactly one probe is allowed after the cooldown and success closes the circuit."""
+        breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        await asyncio.sleep(0.06)
+        self.assertTrue(breaker.allow())   # a chamada de teste
+        self.assertFalse(breaker.allow())  # só uma por vez
+        self.assertEqual(breaker.state, "half_open")
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        await asyncio.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow())
+        print("✅ Gemini circuit breaker half-open probe passed")
+
+    async def test_gemini_client_errors_do_not_trip_breaker(self):
+        """Test if 4xx request errors are neither retried nor counted by the breaker."""
+        scheduler = make_scheduler(breaker_threshold=2)
+        calls = 0
+
+        async def bad_request():
+            nonlocal calls
+            calls += 1
+            raise api_error(400)
+
+        for _ in range(3):
+            with self.assertRaises(genai_errors.APIError):
+                await scheduler.run("s1", 10, bad_request)
+        self.assertEqual(calls, 3)
+        self.assertEqual(scheduler.breaker.state, "closed")
+        self.assertEqual(scheduler.stats()["failures"], 0)
+        await scheduler.close()
+        print("✅ Gemini 4xx errors ignored by breaker passed")
+
+    async def test_gemini_client_error_probe_closes_breaker(self):
+        """Test if a half-open probe that fails with a 400 closes the circuit instead of leaving it stuck."""
+        scheduler = make_scheduler(max_attempts=1, breaker_threshold=1, breaker_cooldown=0.05)
+
+        async def overloaded():
+            raise api_error(503)
+
+        async def bad_request():
+            raise api_error(400)
+
+        with self.assertRaises(genai_errors.APIError):
+            await scheduler.run("s1", 10, overloaded)
+        self.assertEqual(scheduler.breaker.state, "open")
+
+        await asyncio.sleep(0.06)
+        with self.assertRaises(genai_errors.APIError):
+            await scheduler.run("s1", 10, bad_request)
+        self.assertEqual(scheduler.breaker.state, "closed")
+        self.assertEqual(scheduler.breaker.failures, 0)
+        await scheduler.close()
+        print("✅ Gemini half-open probe with 4xx passed")
+
+    async def test_gemini_dispatch_round_robin(self):
+        """Test if queued requests are granted alternating between sessions."""
+        scheduler = make_scheduler()
+        granted = []
+
+        async def request(session_id, label):
+            await scheduler.acquire(session_id, 10)
+            granted.append(label)
+
+        await asyncio.gather(
+            request("a", "a1"), request("a", "a2"), request("a", "a3"), request("b", "b1"), request("c", "c1")
+        )
+        self.assertEqual(granted, ["a1", "b1", "c1", "a2", "a3"])
+        await scheduler.close()
+        print("✅ Gemini round-robin dispatch passed")
+
+    async def test_gemini_acquire_busy(self):
+        """Test if acquire raises GeminiBusy when the queue is full or the wait times out."""
+        # 1 request por minuto: a primeira passa, a segunda fica esperando quota
+        scheduler = make_scheduler(rpm=1, max_queue=1, queue_timeout=0.2)
+        await scheduler.acquire("a", 10)
+
+        waiting = asyncio.ensure_future(scheduler.acquire("b", 10))
+        await asyncio.sleep(0.05)
+        with self.assertRaises(GeminiBusy):
+            await scheduler.acquire("c", 10)  # fila cheia
+
+        with self.assertRaises(GeminiBusy):
+            await waiting  # estourou queue_timeout
+        self.assertEqual(scheduler.stats()["rejected_busy"], 2)
+        await scheduler.close()
+        print("✅ Gemini busy rejection passed")
+
     async def test_404_handling(self):
         """Test how the app handles non-existent routes."""
         response = await self.client.get("/non-existent-route")